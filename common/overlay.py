@@ -0,0 +1,43 @@
+from PyQt5.QtWidgets import QLabel
+from PyQt5.QtCore import Qt, QTimer
+from common.profiling import OVERLAY, PROFILER
+
+class ProfileOverlay(QLabel):
+    # подпись поверх окна: среднее время внешних вызовов по категориям за
+    # последний интервал обновления
+    CATEGORIES = ('paint', 'compute')
+
+    def __init__(self, parent, interval=500):
+        super(ProfileOverlay, self).__init__(parent)
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.setStyleSheet('background: rgba(0, 0, 0, 160); color: white; padding: 4px; font-family: monospace;')
+        self.move(8, 8)
+
+        self.previous = PROFILER.category_totals()
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start()
+        self.refresh()
+
+    def refresh(self):
+        totals = PROFILER.category_totals()
+        lines = []
+        for category in self.CATEGORIES:
+            count, seconds = totals.get(category, (0, 0.0))
+            previous_count, previous_seconds = self.previous.get(category, (0, 0.0))
+            calls = count - previous_count
+            if calls:
+                lines.append(f'{category}: {(seconds - previous_seconds) / calls * 1e3:.2f} ms x {calls}')
+            else:
+                lines.append(f'{category}: -')
+        self.previous = totals
+
+        self.setText('\n'.join(lines))
+        self.adjustSize()
+        self.raise_()
+
+
+def attach_overlay(window):
+    # без CG_PROFILE_OVERLAY ничего не создаётся
+    return ProfileOverlay(window) if OVERLAY else None
@@ -0,0 +1,170 @@
+import os
+import json
+import time
+import atexit
+import threading
+import functools
+import multiprocessing
+
+# замеры вызовов для всех трёх лабораторных. Включаются переменной окружения:
+#
+#   CG_PROFILE=1            запись, при выходе - profile.json и profile.trace.json
+#   CG_PROFILE=/tmp/run     то же в /tmp/run.json и /tmp/run.trace.json
+#   CG_PROFILE_OVERLAY=1    в окне приложения - время отрисовки и вычислений
+#
+# Без CG_PROFILE декоратор profiled возвращает функцию без обёртки, так что
+# выключенные замеры ничего не стоят. .trace.json - формат trace event,
+# открывается в chrome://tracing и Perfetto
+
+ENABLED = os.environ.get('CG_PROFILE', '') not in ('', '0')
+OVERLAY = ENABLED and os.environ.get('CG_PROFILE_OVERLAY', '') not in ('', '0')
+
+# дальше отдельные вызовы не сохраняются, считаются только итоги
+MAX_EVENTS = 1_000_000
+
+
+class Stat:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.size = 0
+
+    def report(self):
+        return {
+            'count': self.count,
+            'total_seconds': self.seconds,
+            'mean_seconds': self.seconds / self.count if self.count else 0.0,
+            'max_seconds': self.max_seconds,
+            'size': self.size,
+        }
+
+
+class Profiler:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.origin = time.perf_counter()
+        # (имя, категория, начало, длительность, размер, поток, вложенность)
+        self.events = []
+        self.dropped = 0
+        self.stats = {}
+        # итоги по категориям только для внешних вызовов: вложенные уже
+        # входят во время вызвавшей их функции
+        self.categories = {}
+
+    def enter(self):
+        depth = getattr(self.local, 'depth', 0)
+        self.local.depth = depth + 1
+        return depth
+
+    def leave(self, depth):
+        self.local.depth = depth
+
+    def record(self, name, category, start, seconds, size, depth):
+        with self.lock:
+            if len(self.events) < MAX_EVENTS:
+                self.events.append((name, category, start - self.origin, seconds, size,
+                                    threading.get_ident(), depth))
+            else:
+                self.dropped += 1
+
+            stat = self.stats.setdefault(name, Stat())
+            stat.count += 1
+            stat.seconds += seconds
+            stat.max_seconds = max(stat.max_seconds, seconds)
+            stat.size += size or 0
+            if depth == 0:
+                count, total = self.categories.get(category, (0, 0.0))
+                self.categories[category] = (count + 1, total + seconds)
+
+    def category_totals(self):
+        with self.lock:
+            return dict(self.categories)
+
+    def report(self):
+        with self.lock:
+            return {
+                'functions': {name: stat.report() for name, stat in sorted(self.stats.items())},
+                'events': [{'name': name, 'category': category, 'start_seconds': start,
+                            'seconds': seconds, 'size': size, 'thread': thread, 'depth': depth}
+                           for name, category, start, seconds, size, thread, depth in self.events],
+                'dropped_events': self.dropped,
+            }
+
+    def trace(self):
+        # события "X" с началом и длительностью в микросекундах
+        pid = os.getpid()
+        with self.lock:
+            events = [{'name': name, 'cat': category, 'ph': 'X', 'ts': start * 1e6, 'dur': seconds * 1e6,
+                       'pid': pid, 'tid': thread, 'args': {} if size is None else {'size': size}}
+                      for name, category, start, seconds, size, thread, _ in self.events]
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export_json(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.report(), file, indent=2)
+            file.write('\n')
+
+    def export_trace(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.trace(), file)
+
+
+PROFILER = Profiler()
+
+
+def profiled(name, category='compute', size=None):
+    # size(result, *args, **kwargs) - объём работы вызова: пиксели, клетки
+    def decorate(function):
+        if not ENABLED:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            # вызов, завершившийся исключением, не записывается
+            depth = PROFILER.enter()
+            start = time.perf_counter()
+            try:
+                result = function(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                PROFILER.leave(depth)
+            PROFILER.record(name, category, start, seconds,
+                            None if size is None else int(size(result, *args, **kwargs)), depth)
+            return result
+        return wrapper
+    return decorate
+
+
+def pixels(result, image, *args, **kwargs):
+    # число элементов первого аргумента: пиксели изображения, цвета массива
+    return getattr(image, 'size', 1)
+
+
+def colors(result, *args, **kwargs):
+    # число цветов в ответе пакетного перевода: массив (..., 3) или (..., 4)
+    return result.size // result.shape[-1]
+
+
+def cells(result, *args, **kwargs):
+    # число клеток в ответе растеризатора xs, ys
+    return len(result[0])
+
+
+def spans(result, *args, **kwargs):
+    # число клеток в отрезках строк rows, starts, ends
+    _, starts, ends = result
+    return (ends - starts + 1).sum()
+
+
+def export(prefix):
+    PROFILER.export_json(prefix + '.json')
+    PROFILER.export_trace(prefix + '.trace.json')
+
+
+# процессы пулов наследуют переменную окружения, но файлы пишет только
+# главный, иначе они перезаписали бы друг друга
+if ENABLED and multiprocessing.parent_process() is None:
+    value = os.environ['CG_PROFILE']
+    atexit.register(export, 'profile' if value == '1' else value)
@@ -0,0 +1,184 @@
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import platform
+# общие модули (common) лежат в корне репозитория; путь к нему добавляет
+# запущенный скрипт, модули, которые только импортируются, sys.path не меняют
+if __name__ == '__main__':
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import numpy as np
+from color_converter import ColorConverter
+from color_lut import ColorLUT
+
+IMAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lab2', 'images')
+
+# направление -> (поэлементная функция, пакетная функция, имя метода ColorLUT)
+DIRECTIONS = {
+    'rgb_to_hsv': (ColorConverter.rgb_to_hsv, ColorConverter.rgb_to_hsv_array, 'rgb_to_hsv'),
+    'hsv_to_rgb': (ColorConverter.hsv_to_rgb, ColorConverter.hsv_to_rgb_array, 'hsv_to_rgb'),
+    'rgb_to_cmyk': (ColorConverter.rgb_to_cmyk, ColorConverter.rgb_to_cmyk_array, 'rgb_to_cmyk'),
+    'cmyk_to_rgb': (ColorConverter.cmyk_to_rgb, ColorConverter.cmyk_to_rgb_array, 'cmyk_to_rgb'),
+}
+
+
+def load_image_pixels(paths, pixels):
+    # изображения целиком, пока не наберётся нужное число пикселей
+    import cv2
+    images = []
+    total = 0
+    for path in paths:
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is not None:
+            images.append(cv2.cvtColor(image, cv2.COLOR_BGR2RGB).reshape(-1, 3))
+            total += images[-1].shape[0]
+        if total >= pixels:
+            break
+    return np.concatenate(images)[:pixels] if images else None
+
+
+def make_datasets(pixels, image_paths, rng):
+    # наборы RGB; входы обратных направлений получаются из них же
+    datasets = {
+        'uniform': rng.integers(0, 256, size=(pixels, 3), dtype=np.uint8),
+    }
+
+    # серые пиксели попадают в ветку delta == 0
+    gray = np.repeat(rng.integers(0, 256, size=(pixels, 1), dtype=np.uint8), 3, axis=1)
+    noisy = rng.random(pixels) < 0.1
+    gray[noisy] = rng.integers(0, 256, size=(int(noisy.sum()), 3), dtype=np.uint8)
+    datasets['grayscale'] = gray
+
+    if image_paths:
+        images = load_image_pixels(image_paths, pixels)
+        if images is not None:
+            datasets['images'] = images
+    return datasets
+
+
+def inputs_for(direction, rgb):
+    if direction.startswith('rgb'):
+        return rgb
+    if direction == 'hsv_to_rgb':
+        return ColorConverter.rgb_to_hsv_array(rgb)
+    return ColorConverter.rgb_to_cmyk_array(rgb)
+
+
+def rate(function, count, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return count / best
+
+
+def benchmark_direction(direction, data, scalar_pixels, repeat, lut):
+    scalar, batch, lut_method = DIRECTIONS[direction]
+    sample = data[:scalar_pixels]
+    sample_list = sample.tolist()
+
+    result = {
+        'pixels': int(data.shape[0]),
+        'scalar_per_second': rate(lambda: [scalar(*p) for p in sample_list], len(sample_list), 1),
+        'batch_per_second': rate(lambda: batch(data), data.shape[0], repeat),
+    }
+
+    # совместимость по битам: поэлементно на выборке, LUT на всём наборе
+    batch_output = batch(data)
+    scalar_output = np.array([scalar(*p) for p in sample_list])
+    result['batch_matches_scalar'] = bool((batch_output[:scalar_pixels] == scalar_output).all())
+
+    if lut is not None:
+        lut_function = getattr(lut, lut_method)
+        lut_function(data[:1])
+        result['lut_per_second'] = rate(lambda: lut_function(data), data.shape[0], repeat)
+        result['lut_matches_batch'] = bool((lut_function(data) == batch_output).all())
+
+    result['batch_speedup'] = result['batch_per_second'] / result['scalar_per_second']
+    return result
+
+
+def round_trip_errors():
+    round_trips = {
+        'rgb_hsv_rgb': lambda rgb: ColorConverter.hsv_to_rgb_array(ColorConverter.rgb_to_hsv_array(rgb)),
+        'rgb_cmyk_rgb': lambda rgb: ColorConverter.cmyk_to_rgb_array(ColorConverter.rgb_to_cmyk_array(rgb)),
+    }
+    max_error = {name: np.zeros(3, dtype=np.int16) for name in round_trips}
+    mismatched = dict.fromkeys(round_trips, 0)
+
+    # весь куб по 16 плоскостей r, чтобы не держать его во float64 целиком
+    gb = np.stack(np.meshgrid(np.arange(256), np.arange(256), indexing='ij'), axis=-1).reshape(-1, 2)
+    for r0 in range(0, 256, 16):
+        rgb = np.empty((16, gb.shape[0], 3), dtype=np.uint8)
+        rgb[..., 0] = np.arange(r0, r0 + 16)[:, None]
+        rgb[..., 1:] = gb
+        rgb = rgb.reshape(-1, 3)
+
+        for name, round_trip in round_trips.items():
+            error = np.abs(round_trip(rgb).astype(np.int16) - rgb.astype(np.int16))
+            max_error[name] = np.maximum(max_error[name], error.max(axis=0))
+            mismatched[name] += int(error.any(axis=1).sum())
+
+    return {name: {
+        'max_error': [int(e) for e in max_error[name]],
+        'mismatched_colors': mismatched[name],
+        'colors': 256 ** 3,
+    } for name in round_trips}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ColorConverter throughput and accuracy benchmark.')
+    parser.add_argument('--pixels', type=int, default=1_000_000, help='pixels per synthetic dataset')
+    parser.add_argument('--scalar-pixels', type=int, default=20_000, help='pixels timed through scalar calls')
+    parser.add_argument('--repeat', type=int, default=3, help='batch runs per measurement, best is reported')
+    parser.add_argument('--images', nargs='*', default=None,
+                        help='images for the whole-image dataset (default: bundled lab2 images)')
+    parser.add_argument('--lut', nargs='?', const=ColorLUT.DEFAULT_DIR, metavar='DIR',
+                        help='also benchmark the lookup-table backend')
+    parser.add_argument('--no-round-trip', action='store_true', help='skip the whole-cube round trip sweep')
+    parser.add_argument('--output', help='write JSON here instead of stdout')
+    args = parser.parse_args()
+
+    image_paths = args.images
+    if image_paths is None:
+        image_paths = sorted(glob.glob(os.path.join(IMAGES_DIR, '*', '*')))
+
+    rng = np.random.default_rng(0)
+    datasets = make_datasets(args.pixels, image_paths, rng)
+    lut = ColorLUT(args.lut) if args.lut else None
+    if lut is not None:
+        lut.load_all()
+
+    report = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'conversions': {},
+    }
+    for direction in DIRECTIONS:
+        report['conversions'][direction] = {}
+        for name, rgb in datasets.items():
+            data = inputs_for(direction, rgb)
+            report['conversions'][direction][name] = benchmark_direction(
+                direction, data, args.scalar_pixels, args.repeat, lut)
+
+    if not args.no_round_trip:
+        report['round_trip'] = round_trip_errors()
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(text + '\n')
+    else:
+        print(text)
+
+    compatible = all(result['batch_matches_scalar'] and result.get('lut_matches_batch', True)
+                     for results in report['conversions'].values() for result in results.values())
+    sys.exit(0 if compatible else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,7 @@
+import numpy as np
+from common.profiling import profiled, colors
+
+
 class ColorConverter:
     @staticmethod
     def rgb_to_hsv(r, g, b):
@@ -56,4 +60,76 @@ class ColorConverter:
         m = (1 - g / 255.0 - k) / (1 - k) if (1 - k) != 0 else 0
         y = (1 - b / 255.0 - k) / (1 - k) if (1 - k) != 0 else 0
 
-        return round(c * 100), round(m * 100), round(y * 100), round(k * 100)
\ No newline at end of file
+        return round(c * 100), round(m * 100), round(y * 100), round(k * 100)
+
+    # пакетные версии: массивы формы (..., 3) / (..., 4), uint8 или float,
+    # с тем же порядком операций и округлением, что и у поэлементных функций
+    @staticmethod
+    @profiled('ColorConverter.rgb_to_hsv_array', size=colors)
+    def rgb_to_hsv_array(rgb):
+        rgb = np.asarray(rgb, dtype=np.float64) / 255.0
+        r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+        cmax = rgb.max(axis=-1)
+        cmin = rgb.min(axis=-1)
+        delta = cmax - cmin
+
+        # выбор сектора в том же порядке, что и в rgb_to_hsv: r, затем g, затем b
+        is_r = cmax == r
+        is_g = ~is_r & (cmax == g)
+        numerator = np.where(is_r, g - b, np.where(is_g, b - r, r - g))
+        offset = np.where(is_r, 360.0, np.where(is_g, 120.0, 240.0))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            h = (60 * (numerator / delta) + offset) % 360
+            s = delta / cmax
+        h = np.where(delta == 0, 0.0, h)
+        s = np.where(cmax == 0, 0.0, s)
+
+        hsv = np.stack([h, s * 100, cmax * 100], axis=-1)
+        return np.rint(hsv).astype(np.uint16)
+
+    @staticmethod
+    @profiled('ColorConverter.cmyk_to_rgb_array', size=colors)
+    def cmyk_to_rgb_array(cmyk):
+        cmyk = np.asarray(cmyk, dtype=np.float64)
+        k = 1 - cmyk[..., 3:] / 100.0
+        rgb = 255 * (1 - cmyk[..., :3] / 100.0) * k
+
+        return np.rint(rgb).astype(np.uint8)
+
+    # индексы компонент (v, k, m, n) для каждого из шести секторов оттенка
+    _HSV_SECTORS = np.array([[0, 1, 2], [3, 0, 2], [2, 0, 1],
+                             [2, 3, 0], [1, 2, 0], [0, 2, 3]])
+
+    @staticmethod
+    @profiled('ColorConverter.hsv_to_rgb_array', size=colors)
+    def hsv_to_rgb_array(hsv):
+        hsv = np.asarray(hsv, dtype=np.float64)
+        h = hsv[..., 0] / 60.0
+        s = hsv[..., 1] / 100.0
+        v = hsv[..., 2] / 100.0
+
+        hi = np.trunc(h)
+        f = h - hi
+        hi = hi.astype(np.intp) % 6
+
+        m = v * (1 - s)
+        n = v * (1 - f * s)
+        k = v * (1 - (1 - f) * s)
+
+        components = np.stack([v, k, m, n], axis=-1)
+        rgb = np.take_along_axis(components, ColorConverter._HSV_SECTORS[hi], axis=-1)
+        return np.rint(rgb * 255).astype(np.uint8)
+
+    @staticmethod
+    @profiled('ColorConverter.rgb_to_cmyk_array', size=colors)
+    def rgb_to_cmyk_array(rgb):
+        x = 1 - np.asarray(rgb, dtype=np.float64) / 255.0
+        k = x.min(axis=-1, keepdims=True)
+        one_minus_k = 1 - k
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cmy = np.where(one_minus_k != 0, (x - k) / one_minus_k, 0.0)
+
+        cmyk = np.concatenate([cmy, k], axis=-1)
+        return np.rint(cmyk * 100).astype(np.uint8)
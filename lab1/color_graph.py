@@ -0,0 +1,314 @@
+from collections import deque
+import numpy as np
+
+
+class ColorSpace:
+    # scale - сколько внешних единиц (0..255, проценты, градусы) приходится
+    # на единицу внутреннего представления: компоненты 0..1, оттенок в градусах
+    def __init__(self, name, channels, scale, dtype, limits=None):
+        self.name = name
+        self.channels = channels
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.dtype = np.dtype(dtype)
+        self.limits = None if limits is None else np.asarray(limits, dtype=np.float64)
+
+    def to_unit(self, values):
+        return np.asarray(values, dtype=np.float64) / self.scale
+
+    def from_unit(self, unit):
+        values = unit * self.scale
+        if self.limits is None:
+            return values.astype(self.dtype, copy=False)
+        # округление только здесь, в самом конце маршрута
+        np.rint(values, out=values)
+        np.clip(values, 0, self.limits, out=values)
+        return values.astype(self.dtype)
+
+
+class ColorGraph:
+    # каждое пространство регистрируется один раз вместе с рёбрами к соседям;
+    # маршрут между любыми двумя ищется поиском в ширину и выполняется во float
+    def __init__(self):
+        self.spaces = {}
+        self.edges = {}
+        self.routes = {}
+
+    def add_space(self, space):
+        self.spaces[space.name] = space
+        self.edges.setdefault(space.name, {})
+        self.routes.clear()
+
+    def add_edge(self, source, target, kernel):
+        self.edges[source][target] = kernel
+        self.routes.clear()
+
+    def route(self, source, target):
+        key = (source, target)
+        if key not in self.routes:
+            self.routes[key] = self.find_route(source, target)
+        return self.routes[key]
+
+    def find_route(self, source, target):
+        if source not in self.spaces or target not in self.spaces:
+            raise KeyError(f'unknown color space: {source if source not in self.spaces else target}')
+
+        previous = {source: None}
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            if node == target:
+                break
+            for neighbour in self.edges[node]:
+                if neighbour not in previous:
+                    previous[neighbour] = node
+                    queue.append(neighbour)
+        if target not in previous:
+            raise ValueError(f'no conversion from {source} to {target}')
+
+        path = [target]
+        while previous[path[-1]] is not None:
+            path.append(previous[path[-1]])
+        path.reverse()
+        return [self.edges[a][b] for a, b in zip(path, path[1:])]
+
+    def convert(self, values, source, target):
+        unit = self.spaces[source].to_unit(values)
+        # один цвет превращаем в массив из одного пикселя, чтобы ядра работали с массивами
+        single = unit.ndim == 1
+        if single:
+            unit = unit[np.newaxis]
+
+        for kernel in self.route(source, target):
+            unit = kernel(unit)
+
+        result = self.spaces[target].from_unit(unit)
+        return result[0] if single else result
+
+
+# ядра работают с внутренним представлением: массивы float64 формы (..., n)
+
+def rgb_to_hsv(rgb):
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    cmax = rgb.max(axis=-1)
+    delta = cmax - rgb.min(axis=-1)
+
+    hsv = np.empty(rgb.shape, dtype=np.float64)
+    hsv[..., 0] = hue(r, g, b, cmax, delta)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(delta, cmax, out=hsv[..., 1])
+    hsv[..., 1][cmax == 0] = 0
+    hsv[..., 2] = cmax
+    return hsv
+
+
+def hue(r, g, b, cmax, delta):
+    # тот же выбор сектора, что и в ColorConverter.rgb_to_hsv
+    is_r = cmax == r
+    is_g = ~is_r & (cmax == g)
+    numerator = np.where(is_r, g - b, np.where(is_g, b - r, r - g))
+    offset = np.where(is_r, 360.0, np.where(is_g, 120.0, 240.0))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        h = (60 * (numerator / delta) + offset) % 360
+    h[delta == 0] = 0
+    return h
+
+
+# индексы компонент (v, k, m, n) для каждого из шести секторов оттенка
+HSV_SECTORS = np.array([[0, 1, 2], [3, 0, 2], [2, 0, 1],
+                        [2, 3, 0], [1, 2, 0], [0, 2, 3]])
+
+
+def hsv_sector(hsv):
+    h = hsv[..., 0] / 60.0
+    hi = np.trunc(h)
+    f = h - hi
+    return hi.astype(np.intp) % 6, f
+
+
+def hsv_to_rgb(hsv):
+    hi, f = hsv_sector(hsv)
+    s, v = hsv[..., 1], hsv[..., 2]
+
+    components = np.stack([v, v * (1 - (1 - f) * s), v * (1 - s), v * (1 - f * s)], axis=-1)
+    return np.take_along_axis(components, HSV_SECTORS[hi], axis=-1)
+
+
+def rgb_to_cmyk(rgb):
+    cmyk = np.empty(rgb.shape[:-1] + (4,), dtype=np.float64)
+    x = np.subtract(1, rgb, out=cmyk[..., :3])
+    k = x.min(axis=-1, keepdims=True)
+    cmyk[..., 3:] = k
+
+    one_minus_k = 1 - k
+    x -= k
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x /= one_minus_k
+    x[np.broadcast_to(one_minus_k == 0, x.shape)] = 0
+    return cmyk
+
+
+def cmyk_to_rgb(cmyk):
+    # множители в том же порядке, что и в ColorConverter.cmyk_to_rgb:
+    # 255 * (1 - c) * (1 - k). Деление на 255 здесь и умножение в from_unit
+    # после округления дают тот же результат на всех 101 x 101 парах (c, k),
+    # а (1 - c) * (1 - k) * 255 расходился с ним на единицу
+    rgb = 255 * np.subtract(1, cmyk[..., :3])
+    rgb *= 1 - cmyk[..., 3:]
+    rgb /= 255
+    return rgb
+
+
+def hsv_to_cmyk(hsv):
+    # слитое ядро: max(r, g, b) = v, поэтому k = 1 - v, а c, m, y = 1 - (канал / v)
+    # выражаются прямо через сектор оттенка без промежуточного RGB
+    hi, f = hsv_sector(hsv)
+    s, v = hsv[..., 1], hsv[..., 2]
+
+    cmyk = np.empty(hsv.shape[:-1] + (4,), dtype=np.float64)
+    components = np.stack([np.zeros_like(s), (1 - f) * s, s, f * s], axis=-1)
+    cmyk[..., :3] = np.take_along_axis(components, HSV_SECTORS[hi], axis=-1)
+    cmyk[..., :3][v == 0] = 0
+    cmyk[..., 3] = 1 - v
+    return cmyk
+
+
+def cmyk_to_hsv(cmyk):
+    # слитое ядро: оттенок и насыщенность не зависят от k, яркость умножается на 1 - k
+    hsv = rgb_to_hsv(1 - cmyk[..., :3])
+    one_minus_k = 1 - cmyk[..., 3]
+    hsv[..., 2] *= one_minus_k
+    hsv[..., :2][one_minus_k == 0] = 0
+    return hsv
+
+
+def rgb_to_hls(rgb):
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    cmax = rgb.max(axis=-1)
+    cmin = rgb.min(axis=-1)
+    delta = cmax - cmin
+    total = cmax + cmin
+
+    hls = np.empty(rgb.shape, dtype=np.float64)
+    hls[..., 0] = hue(r, g, b, cmax, delta)
+    hls[..., 1] = total / 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        hls[..., 2] = np.where(total <= 1, delta / total, delta / (2 - total))
+    hls[..., 2][delta == 0] = 0
+    return hls
+
+
+def hls_to_hsv(hls):
+    l, s = hls[..., 1], hls[..., 2]
+    hsv = np.empty(hls.shape, dtype=np.float64)
+    hsv[..., 0] = hls[..., 0]
+    hsv[..., 2] = l + s * np.minimum(l, 1 - l)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        hsv[..., 1] = 2 * (1 - l / hsv[..., 2])
+    hsv[..., 1][hsv[..., 2] == 0] = 0
+    return hsv
+
+
+def hsv_to_hls(hsv):
+    s, v = hsv[..., 1], hsv[..., 2]
+    hls = np.empty(hsv.shape, dtype=np.float64)
+    hls[..., 0] = hsv[..., 0]
+    l = hls[..., 1] = v * (1 - s / 2)
+    denominator = np.minimum(l, 1 - l)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        hls[..., 2] = (v - l) / denominator
+    hls[..., 2][denominator == 0] = 0
+    return hls
+
+
+def hls_to_rgb(hls):
+    return hsv_to_rgb(hls_to_hsv(hls))
+
+
+# sRGB с белой точкой D65
+RGB_TO_XYZ = np.array([[0.4124564, 0.3575761, 0.1804375],
+                       [0.2126729, 0.7151522, 0.0721750],
+                       [0.0193339, 0.1191920, 0.9503041]])
+XYZ_TO_RGB = np.linalg.inv(RGB_TO_XYZ)
+WHITE_D65 = np.array([0.95047, 1.0, 1.08883])
+LAB_EPSILON = (6 / 29) ** 3
+
+
+def linearize(rgb):
+    return np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+
+
+def gamma_encode(linear):
+    np.clip(linear, 0, 1, out=linear)
+    return np.where(linear <= 0.0031308, linear * 12.92, 1.055 * linear ** (1 / 2.4) - 0.055)
+
+
+def rgb_to_xyz(rgb):
+    return linearize(rgb) @ RGB_TO_XYZ.T
+
+
+def xyz_to_rgb(xyz):
+    return gamma_encode(xyz @ XYZ_TO_RGB.T)
+
+
+def xyz_to_lab(xyz):
+    t = xyz / WHITE_D65
+    f = np.where(t > LAB_EPSILON, np.cbrt(t), t / (3 * (6 / 29) ** 2) + 4 / 29)
+
+    lab = np.empty(xyz.shape, dtype=np.float64)
+    lab[..., 0] = 116 * f[..., 1] - 16
+    lab[..., 1] = 500 * (f[..., 0] - f[..., 1])
+    lab[..., 2] = 200 * (f[..., 1] - f[..., 2])
+    return lab
+
+
+def lab_to_xyz(lab):
+    f = np.empty(lab.shape, dtype=np.float64)
+    f[..., 1] = (lab[..., 0] + 16) / 116
+    f[..., 0] = f[..., 1] + lab[..., 1] / 500
+    f[..., 2] = f[..., 1] - lab[..., 2] / 200
+
+    t = np.where(f > 6 / 29, f ** 3, 3 * (6 / 29) ** 2 * (f - 4 / 29))
+    t *= WHITE_D65
+    return t
+
+
+def rgb_to_lab(rgb):
+    # прямое ребро rgb -> lab вместо маршрута через xyz: сами вычисления те же
+    return xyz_to_lab(rgb_to_xyz(rgb))
+
+
+def lab_to_rgb(lab):
+    return xyz_to_rgb(lab_to_xyz(lab))
+
+
+def build_default_graph():
+    graph = ColorGraph()
+    graph.add_space(ColorSpace('rgb', 3, 255.0, np.uint8, limits=255))
+    graph.add_space(ColorSpace('hsv', 3, (1, 100.0, 100.0), np.uint16, limits=(360, 100, 100)))
+    graph.add_space(ColorSpace('hls', 3, (1, 100.0, 100.0), np.uint16, limits=(360, 100, 100)))
+    graph.add_space(ColorSpace('cmyk', 4, 100.0, np.uint8, limits=100))
+    graph.add_space(ColorSpace('xyz', 3, 100.0, np.float64))
+    graph.add_space(ColorSpace('lab', 3, 1, np.float64))
+
+    edges = [
+        ('rgb', 'hsv', rgb_to_hsv), ('hsv', 'rgb', hsv_to_rgb),
+        ('rgb', 'cmyk', rgb_to_cmyk), ('cmyk', 'rgb', cmyk_to_rgb),
+        ('rgb', 'hls', rgb_to_hls), ('hls', 'rgb', hls_to_rgb),
+        ('rgb', 'xyz', rgb_to_xyz), ('xyz', 'rgb', xyz_to_rgb),
+        ('xyz', 'lab', xyz_to_lab), ('lab', 'xyz', lab_to_xyz),
+        # слитые ядра для частых пар, чтобы не было промежуточных шагов
+        ('hsv', 'cmyk', hsv_to_cmyk), ('cmyk', 'hsv', cmyk_to_hsv),
+        ('hsv', 'hls', hsv_to_hls), ('hls', 'hsv', hls_to_hsv),
+        ('rgb', 'lab', rgb_to_lab), ('lab', 'rgb', lab_to_rgb),
+    ]
+    for source, target, kernel in edges:
+        graph.add_edge(source, target, kernel)
+    return graph
+
+
+COLOR_GRAPH = build_default_graph()
+
+
+def convert(values, source, target):
+    return COLOR_GRAPH.convert(values, source, target)
@@ -0,0 +1,178 @@
+import os
+import sys
+import time
+import tempfile
+# общие модули (common) лежат в корне репозитория; путь к нему добавляет
+# запущенный скрипт, модули, которые только импортируются, sys.path не меняют
+if __name__ == '__main__':
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import numpy as np
+from color_converter import ColorConverter
+
+
+class ColorLUT:
+    # целочисленные результаты ColorConverter образуют конечные таблицы:
+    # строим их один раз, сохраняем в .npy и дальше открываем через mmap
+    VERSION = 1
+    DEFAULT_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'color_lut')
+
+    # имя таблицы -> (форма, тип)
+    TABLES = {
+        'rgb_hue': ((256 ** 3,), np.uint16),
+        'rgb_sv': ((256 ** 3, 2), np.uint8),
+        'rgb_cmyk': ((256 ** 3, 4), np.uint8),
+        'hsv_rgb': ((361 * 101 * 101, 3), np.uint8),
+        # cmyk_to_rgb раскладывается по каналам: r зависит только от (c, k),
+        # g от (m, k), b от (y, k), поэтому вместо 101^4 хватает 101 x 101
+        'cmyk_channel': ((101, 101), np.uint8),
+    }
+
+    def __init__(self, directory=DEFAULT_DIR):
+        self.directory = directory
+        self.tables = {}
+
+    def path(self, name):
+        return os.path.join(self.directory, f'{name}.v{self.VERSION}.npy')
+
+    def table(self, name):
+        if name not in self.tables:
+            path = self.path(name)
+            if not os.path.exists(path):
+                self.build(name)
+            self.tables[name] = np.load(path, mmap_mode='r')
+        return self.tables[name]
+
+    def build(self, name):
+        os.makedirs(self.directory, exist_ok=True)
+        shape, dtype = self.TABLES[name]
+
+        # пишем во временный файл и переименовываем, чтобы параллельный
+        # процесс никогда не открыл недостроенную таблицу
+        fd, tmp_path = tempfile.mkstemp(suffix='.npy', dir=self.directory)
+        os.close(fd)
+        try:
+            table = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype, shape=shape)
+            self.fill(name, table)
+            table.flush()
+            del table
+            os.replace(tmp_path, self.path(name))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    @staticmethod
+    def fill(name, table):
+        if name in ('rgb_hue', 'rgb_sv', 'rgb_cmyk'):
+            # по 16 плоскостей r за раз, чтобы не держать в памяти весь куб во float64
+            gb = np.stack(np.meshgrid(np.arange(256), np.arange(256), indexing='ij'), axis=-1).reshape(-1, 2)
+            for r0 in range(0, 256, 16):
+                rgb = np.empty((16, gb.shape[0], 3), dtype=np.uint8)
+                rgb[..., 0] = np.arange(r0, r0 + 16)[:, None]
+                rgb[..., 1:] = gb
+                rgb = rgb.reshape(-1, 3)
+                chunk = slice(r0 << 16, (r0 + 16) << 16)
+
+                if name == 'rgb_cmyk':
+                    table[chunk] = ColorConverter.rgb_to_cmyk_array(rgb)
+                else:
+                    hsv = ColorConverter.rgb_to_hsv_array(rgb)
+                    if name == 'rgb_hue':
+                        table[chunk] = hsv[:, 0]
+                    else:
+                        table[chunk] = hsv[:, 1:]
+        elif name == 'hsv_rgb':
+            hsv = np.stack(np.meshgrid(np.arange(361), np.arange(101), np.arange(101), indexing='ij'), axis=-1)
+            table[:] = ColorConverter.hsv_to_rgb_array(hsv.reshape(-1, 3))
+        elif name == 'cmyk_channel':
+            x, k = np.meshgrid(np.arange(101), np.arange(101), indexing='ij')
+            cmyk = np.stack([x, x, x, k], axis=-1)
+            table[:] = ColorConverter.cmyk_to_rgb_array(cmyk)[..., 0]
+
+    # наибольшие допустимые значения компонент: индекс за пределами таблицы
+    # дал бы чужую ячейку, а не ошибку
+    RGB_MAX = (255, 255, 255)
+    HSV_MAX = (360, 100, 100)
+    CMYK_MAX = (100, 100, 100, 100)
+
+    @staticmethod
+    def as_index(values, upper):
+        values = np.asarray(values)
+        if not np.issubdtype(values.dtype, np.integer):
+            raise TypeError('lookup tables need integer input, use ColorConverter.*_array for floats')
+        if values.shape[-1:] != (len(upper),):
+            raise ValueError(f'expected an array of shape (..., {len(upper)}), got {values.shape}')
+        if values.size and ((values < 0).any() or (values > np.array(upper)).any()):
+            raise ValueError(f'components out of range 0..{upper}')
+        return values.astype(np.intp)
+
+    def close(self):
+        # отображённые файлы закрываются, когда на таблицы не остаётся ссылок;
+        # на Windows иначе их нельзя удалить
+        self.tables.clear()
+
+    def rgb_to_hsv(self, rgb):
+        rgb = self.as_index(rgb, self.RGB_MAX)
+        index = (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+
+        hsv = np.empty(rgb.shape, dtype=np.uint16)
+        hsv[..., 0] = self.table('rgb_hue')[index]
+        hsv[..., 1:] = self.table('rgb_sv')[index]
+        return hsv
+
+    def rgb_to_cmyk(self, rgb):
+        rgb = self.as_index(rgb, self.RGB_MAX)
+        index = (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+        return self.table('rgb_cmyk')[index]
+
+    def hsv_to_rgb(self, hsv):
+        hsv = self.as_index(hsv, self.HSV_MAX)
+        index = (hsv[..., 0] * 101 + hsv[..., 1]) * 101 + hsv[..., 2]
+        return self.table('hsv_rgb')[index]
+
+    def cmyk_to_rgb(self, cmyk):
+        cmyk = self.as_index(cmyk, self.CMYK_MAX)
+        return self.table('cmyk_channel')[cmyk[..., :3], cmyk[..., 3:]]
+
+    def load_all(self):
+        for name in self.TABLES:
+            self.table(name)
+
+
+def timed(action):
+    start = time.perf_counter()
+    action()
+    return time.perf_counter() - start
+
+
+def main():
+    # холодный старт (построение таблиц) против тёплого (только mmap)
+    pixels = int(sys.argv[1]) if len(sys.argv) > 1 else 1920 * 1080
+    rng = np.random.default_rng(0)
+    rgb = rng.integers(0, 256, size=(pixels, 3), dtype=np.uint8)
+
+    def convert(lut):
+        lut.load_all()
+        lut.rgb_to_hsv(rgb)
+        lut.rgb_to_cmyk(rgb)
+        lut.close()
+
+    with tempfile.TemporaryDirectory() as directory:
+        cold = timed(lambda: convert(ColorLUT(directory)))
+        warm = timed(lambda: convert(ColorLUT(directory)))
+        lut = ColorLUT(directory)
+        lut.load_all()
+        lookup = timed(lambda: (lut.rgb_to_hsv(rgb), lut.rgb_to_cmyk(rgb)))
+        # таблицы закрываются до удаления каталога
+        lut.close()
+
+    batch = timed(lambda: (ColorConverter.rgb_to_hsv_array(rgb), ColorConverter.rgb_to_cmyk_array(rgb)))
+
+    print(f'pixels:            {pixels}')
+    print(f'cold start:        {cold:.3f} s (build + save + convert)')
+    print(f'warm start:        {warm:.3f} s (mmap + convert)')
+    print(f'lookup only:       {lookup:.3f} s')
+    print(f'batch arithmetic:  {batch:.3f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+# общие модули (common) лежат в корне репозитория; путь к нему добавляет
+# запущенный скрипт, модули, которые только импортируются, sys.path не меняют
+if __name__ == '__main__':
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import numpy as np
+from color_graph import COLOR_GRAPH
+from color_lut import ColorLUT
+
+# число каналов и тип хранения для каждого пространства
+SPACES = {name: (space.channels, space.dtype) for name, space in COLOR_GRAPH.spaces.items()}
+LUT_SPACES = ('rgb', 'hsv', 'cmyk')
+
+RAW_EXTENSIONS = ('.raw', '.bin')
+
+
+def make_converter(source, target, lut=None):
+    if lut is None:
+        # маршрут по графу считается во float и округляется один раз
+        return lambda band: COLOR_GRAPH.convert(band, source, target)
+
+    # таблицы есть только для пар с RGB и дают те же числа, что и граф.
+    # Путь hsv <-> cmyk через таблицы округлял бы до 8-битного RGB посередине
+    # (оттенок серых цветов уходил на десятки градусов), поэтому он не
+    # поддерживается, а не считается приближённо
+    if source not in LUT_SPACES or target not in LUT_SPACES or 'rgb' not in (source, target):
+        sys.exit('lookup tables only cover conversions to and from rgb; '
+                 'convert other pairs without --lut')
+    to_rgb = {
+        'rgb': lambda x: x,
+        'hsv': lut.hsv_to_rgb,
+        'cmyk': lut.cmyk_to_rgb,
+    }[source]
+    from_rgb = {
+        'rgb': lambda x: x,
+        'hsv': lut.rgb_to_hsv,
+        'cmyk': lut.rgb_to_cmyk,
+    }[target]
+    return lambda band: from_rgb(to_rgb(band))
+
+
+def open_input(path, space, shape):
+    channels, dtype = SPACES[space]
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == '.npy':
+        return np.load(path, mmap_mode='r')
+    if extension in RAW_EXTENSIONS:
+        if shape is None:
+            sys.exit('--shape HEIGHT WIDTH is required for raw pixel dumps')
+        return np.memmap(path, dtype=dtype, mode='r', shape=(shape[0], shape[1], channels))
+
+    # обычные изображения декодируются целиком, поблочно идёт только конвертация
+    if space != 'rgb':
+        sys.exit('image files can only be read as rgb')
+    import cv2
+    image = cv2.imread(path, cv2.IMREAD_COLOR)
+    if image is None:
+        sys.exit(f'cannot read image {path}')
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
+def open_output(path, space, height, width):
+    channels, dtype = SPACES[space]
+    shape = (height, width, channels)
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == '.npy':
+        return np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape), None
+    if extension in RAW_EXTENSIONS:
+        return np.memmap(path, dtype=dtype, mode='w+', shape=shape), None
+
+    # для кодировщика изображения нужен весь кадр: собираем его во временном mmap
+    if space != 'rgb':
+        sys.exit('image files can only be written as rgb')
+    fd, tmp_path = tempfile.mkstemp(suffix='.raw')
+    os.close(fd)
+    return np.memmap(tmp_path, dtype=dtype, mode='w+', shape=shape), tmp_path
+
+
+def convert(source_image, target_image, converter, band_rows):
+    height = source_image.shape[0]
+    for y0 in range(0, height, band_rows):
+        y1 = min(y0 + band_rows, height)
+        target_image[y0:y1] = converter(source_image[y0:y1])
+        if isinstance(target_image, np.memmap):
+            target_image.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert images or raw pixel dumps between color spaces.')
+    parser.add_argument('input', help='.npy, .raw/.bin dump or image file')
+    parser.add_argument('output', help='.npy, .raw/.bin dump or image file (rgb only)')
+    parser.add_argument('--from', dest='source', choices=SPACES, default='rgb')
+    parser.add_argument('--to', dest='target', choices=SPACES, required=True)
+    parser.add_argument('--shape', type=int, nargs=2, metavar=('HEIGHT', 'WIDTH'),
+                        help='image size for raw pixel dumps')
+    parser.add_argument('--band-rows', type=int, default=256, help='rows converted per band')
+    parser.add_argument('--lut', nargs='?', const=ColorLUT.DEFAULT_DIR, metavar='DIR',
+                        help='use memory-mapped lookup tables (built on first use); '
+                             'only for rgb <-> hsv/cmyk, same output as without it')
+    args = parser.parse_args()
+
+    source_image = open_input(args.input, args.source, args.shape)
+    channels = SPACES[args.source][0]
+    if source_image.ndim != 3 or source_image.shape[2] != channels:
+        sys.exit(f'expected {channels} channels for {args.source}, got shape {source_image.shape}')
+
+    height, width = source_image.shape[:2]
+    target_image, tmp_path = open_output(args.output, args.target, height, width)
+    lut = ColorLUT(args.lut) if args.lut else None
+
+    start = time.perf_counter()
+    try:
+        convert(source_image, target_image, make_converter(args.source, args.target, lut), args.band_rows)
+        if tmp_path is not None:
+            import cv2
+            cv2.imwrite(args.output, cv2.cvtColor(np.asarray(target_image), cv2.COLOR_RGB2BGR))
+    finally:
+        del target_image
+        if tmp_path is not None:
+            os.remove(tmp_path)
+    elapsed = time.perf_counter() - start
+
+    megapixels = height * width / 1e6
+    print(f'{args.input} -> {args.output}: {width}x{height} {args.source} -> {args.target}, '
+          f'{elapsed:.3f} s, {megapixels / elapsed:.1f} MP/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,15 @@
+import os
 import sys
+# общие модули (common) лежат в корне репозитория; путь к нему добавляет
+# запущенный скрипт, модули, которые только импортируются, sys.path не меняют
+if __name__ == '__main__':
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 from PyQt5.QtWidgets import QApplication, QMainWindow, QFrame, QLabel, QPushButton, QColorDialog, QGridLayout, QWidget, QLineEdit, QSlider
-from PyQt5.QtCore import Qt
-from color_converter import ColorConverter
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QColor, QPalette
+from color_graph import convert
+from common.profiling import profiled
+from common.overlay import attach_overlay
 
 class ColorApp(QMainWindow):
     def __init__(self):
@@ -9,6 +17,13 @@ class ColorApp(QMainWindow):
 
         self.r, self.g, self.b, self.c, self.m, self.yy, self.k, self.h, self.s, self.v = [0] * 10
 
+        # события слайдеров копятся и применяются не чаще одного раза за кадр
+        self.pending_update = None
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(16)
+        self.refresh_timer.timeout.connect(self.flush_pending_update)
+
         central_widget = QWidget(self)
         self.setCentralWidget(central_widget)
 
@@ -21,12 +36,22 @@ class ColorApp(QMainWindow):
         self.create_color_rectangle()
         self.create_palette_button()
 
+        # время переводов цвета поверх окна, если включено CG_PROFILE_OVERLAY
+        self.profile_overlay = attach_overlay(self)
+
     def create_color_rectangle(self):
         self.rectangle = QFrame()
         self.rectangle.setFrameShape(QFrame.Box)
-        self.rectangle.setStyleSheet("background-color: rgb(0, 0, 0);")
+        # цвет задаётся через палитру, без разбора таблицы стилей
+        self.rectangle.setAutoFillBackground(True)
+        self.set_rectangle_color(0, 0, 0)
         self.layout.addWidget(self.rectangle, 0, 6, 9, 5)
 
+    def set_rectangle_color(self, r, g, b):
+        palette = self.rectangle.palette()
+        palette.setColor(QPalette.Window, QColor(r, g, b))
+        self.rectangle.setPalette(palette)
+
     def create_palette_button(self):
         self.color_button = QPushButton('Choose color')
         self.color_button.clicked.connect(self.show_color_dialog)
@@ -35,6 +60,7 @@ class ColorApp(QMainWindow):
     def show_color_dialog(self):
         color = QColorDialog.getColor()
         if color.isValid():
+            self.cancel_pending_update()
             self.r, self.g, self.b = color.red(), color.green(), color.blue()
             self.update_from_rgb()
 
@@ -65,75 +91,121 @@ class ColorApp(QMainWindow):
         self.rgb_linedits = [self.create_line_edit(self.update_from_rgb_linedit) for _ in range(3)]
         self.hsv_linedits = [self.create_line_edit(self.update_from_hsv_linedit) for _ in range(3)]
 
+        self.sliders = self.cmyk_sliders + self.rgb_sliders + self.hsv_sliders
+        self.linedits = self.cmyk_linedits + self.rgb_linedits + self.hsv_linedits
+
     def set_widgets_position(self):
         for i, label in enumerate(self.labels):
             self.layout.addWidget(label, i, 0)
 
-        for i, slider in enumerate(self.cmyk_sliders + self.rgb_sliders + self.hsv_sliders):
+        for i, slider in enumerate(self.sliders):
             self.layout.addWidget(slider, i, 2, 1, 4)
 
-        for i, linedit in enumerate(self.cmyk_linedits + self.rgb_linedits + self.hsv_linedits):
+        for i, linedit in enumerate(self.linedits):
             self.layout.addWidget(linedit, i, 1)
 
+    # обновляются только виджеты, значение которых действительно изменилось
     def update_sliders_and_linedits(self):
-        self.block_signals(True)
-
-        sliders = self.cmyk_sliders + self.rgb_sliders + self.hsv_sliders
         values = [self.c, self.m, self.yy, self.k, self.r, self.g, self.b, self.h, self.s, self.v]
-        for slider, value in zip(sliders, values):
-            slider.setValue(int(value))
-
-        linedits = self.cmyk_linedits + self.rgb_linedits + self.hsv_linedits
-        for linedit, value in zip(linedits, values):
-            linedit.setText(str(int(value)))
-
-        self.rectangle.setStyleSheet(f"background-color: rgb({self.r}, {self.g}, {self.b});")
-
-        self.block_signals(False)
-
-    def block_signals(self, is_block):
-        for slider in self.cmyk_sliders + self.rgb_sliders + self.hsv_sliders:
-            slider.blockSignals(is_block)
-        for linedit in self.cmyk_linedits + self.rgb_linedits + self.hsv_linedits:
-            linedit.blockSignals(is_block)
-
+        for slider, linedit, value in zip(self.sliders, self.linedits, values):
+            value = int(value)
+            if slider.value() != value:
+                slider.blockSignals(True)
+                slider.setValue(value)
+                slider.blockSignals(False)
+            if linedit.text() != str(value):
+                linedit.blockSignals(True)
+                linedit.setText(str(value))
+                linedit.blockSignals(False)
+
+        color = QColor(int(self.r), int(self.g), int(self.b))
+        if self.rectangle.palette().color(QPalette.Window) != color:
+            self.set_rectangle_color(color.red(), color.green(), color.blue())
+
+    def schedule_update(self, update, sliders):
+        # при смене группы слайдеров сначала применяем накопленное; оно
+        # переписывает и только что сдвинутую группу, поэтому её значения
+        # возвращаются, а сама она применяется последней, по таймеру
+        if self.pending_update is not None and self.pending_update != update:
+            values = [slider.value() for slider in sliders]
+            self.flush_pending_update()
+            for slider, value in zip(sliders, values):
+                slider.blockSignals(True)
+                slider.setValue(value)
+                slider.blockSignals(False)
+        self.pending_update = update
+        if not self.refresh_timer.isActive():
+            self.refresh_timer.start()
+
+    def flush_pending_update(self):
+        self.refresh_timer.stop()
+        update, self.pending_update = self.pending_update, None
+        if update is not None:
+            update()
+
+    # ввод в поле или палитре заменяет всё состояние, накопленное больше не нужно
+    def cancel_pending_update(self):
+        self.refresh_timer.stop()
+        self.pending_update = None
+
+    # все переводы идут через граф: CMYK <-> HSV одним слитым проходом, без
+    # округления промежуточного RGB, а пары с RGB округляются так же, как в
+    # ColorConverter, поэтому поля всегда согласованы между собой
+    @profiled('ColorApp.update_from_cmyk')
     def update_from_cmyk(self):
-        self.r, self.g, self.b = ColorConverter.cmyk_to_rgb(self.c, self.m, self.yy, self.k)
-        self.h, self.s, self.v = ColorConverter.rgb_to_hsv(self.r, self.g, self.b)
+        cmyk = (self.c, self.m, self.yy, self.k)
+        self.r, self.g, self.b = [int(x) for x in convert(cmyk, 'cmyk', 'rgb')]
+        self.h, self.s, self.v = [int(x) for x in convert(cmyk, 'cmyk', 'hsv')]
         self.update_sliders_and_linedits()
 
+    @profiled('ColorApp.update_from_rgb')
     def update_from_rgb(self):
-        self.c, self.m, self.yy, self.k = ColorConverter.rgb_to_cmyk(self.r, self.g, self.b)
-        self.h, self.s, self.v = ColorConverter.rgb_to_hsv(self.r, self.g, self.b)
+        rgb = (self.r, self.g, self.b)
+        self.c, self.m, self.yy, self.k = [int(x) for x in convert(rgb, 'rgb', 'cmyk')]
+        self.h, self.s, self.v = [int(x) for x in convert(rgb, 'rgb', 'hsv')]
         self.update_sliders_and_linedits()
 
+    @profiled('ColorApp.update_from_hsv')
     def update_from_hsv(self):
-        self.r, self.g, self.b = ColorConverter.hsv_to_rgb(self.h, self.s, self.v)
-        self.c, self.m, self.yy, self.k = ColorConverter.rgb_to_cmyk(self.r, self.g, self.b)
+        hsv = (self.h, self.s, self.v)
+        self.r, self.g, self.b = [int(x) for x in convert(hsv, 'hsv', 'rgb')]
+        self.c, self.m, self.yy, self.k = [int(x) for x in convert(hsv, 'hsv', 'cmyk')]
         self.update_sliders_and_linedits()
 
     # handlers
     def update_from_cmyk_slider(self):
+        self.schedule_update(self.apply_cmyk_sliders, self.cmyk_sliders)
+
+    def update_from_rgb_slider(self):
+        self.schedule_update(self.apply_rgb_sliders, self.rgb_sliders)
+
+    def update_from_hsv_slider(self):
+        self.schedule_update(self.apply_hsv_sliders, self.hsv_sliders)
+
+    def apply_cmyk_sliders(self):
         self.c, self.m, self.yy, self.k = [s.value() for s in self.cmyk_sliders]
         self.update_from_cmyk()
 
-    def update_from_rgb_slider(self):
+    def apply_rgb_sliders(self):
         self.r, self.g, self.b = [s.value() for s in self.rgb_sliders]
         self.update_from_rgb()
 
-    def update_from_hsv_slider(self):
+    def apply_hsv_sliders(self):
         self.h, self.s, self.v = [s.value() for s in self.hsv_sliders]
         self.update_from_hsv()
 
     def update_from_cmyk_linedit(self):
+        self.cancel_pending_update()
         self.c, self.m, self.yy, self.k = [self.validate(l.text(), 0, 100) for l in self.cmyk_linedits]
         self.update_from_cmyk()
 
     def update_from_rgb_linedit(self):
+        self.cancel_pending_update()
         self.r, self.g, self.b = [self.validate(l.text(), 0, 255) for l in self.rgb_linedits]
         self.update_from_rgb()
 
     def update_from_hsv_linedit(self):
+        self.cancel_pending_update()
         self.h = self.validate(self.hsv_linedits[0].text(), 0, 360)
         self.s = self.validate(self.hsv_linedits[1].text(), 0, 100)
         self.v = self.validate(self.hsv_linedits[2].text(), 0, 100)
@@ -0,0 +1,17 @@
+import os
+import sys
+import pytest
+
+# модули лабораторной импортируются по имени, как в её скриптах, а common - из корня репозитория
+LAB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, LAB_DIR)
+sys.path.append(os.path.join(LAB_DIR, '..'))
+
+# окно ColorApp создаётся без показа
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+
+@pytest.fixture(scope='session')
+def app():
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+from color_converter import ColorConverter
+
+# эталон - поэлементные функции ColorConverter из исходной версии окна
+
+RNG = np.random.default_rng(7)
+SAMPLES = {
+    'rgb': RNG.integers(0, 256, size=(20000, 3)),
+    'hsv': np.c_[RNG.integers(0, 361, 20000), RNG.integers(0, 101, (20000, 2))],
+    'cmyk': RNG.integers(0, 101, size=(20000, 4)),
+}
+
+
+def scalar(function, values):
+    return np.array([function(*map(int, color)) for color in values])
+
+
+@pytest.mark.parametrize('name', ['rgb_to_hsv', 'rgb_to_cmyk', 'hsv_to_rgb', 'cmyk_to_rgb'])
+def test_arrays_match_scalar(name):
+    sample = SAMPLES[name.split('_')[0]]
+    expected = scalar(getattr(ColorConverter, name), sample)
+    np.testing.assert_array_equal(getattr(ColorConverter, name + '_array')(sample), expected)
+
+
+def test_arrays_accept_floats_and_keep_shape():
+    rgb = SAMPLES['rgb'][:12].reshape(3, 4, 3)
+    hsv = ColorConverter.rgb_to_hsv_array(rgb.astype(np.float64))
+    assert hsv.shape == (3, 4, 3)
+    np.testing.assert_array_equal(hsv, ColorConverter.rgb_to_hsv_array(rgb.astype(np.uint8)))
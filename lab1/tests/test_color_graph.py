@@ -0,0 +1,56 @@
+import itertools
+import numpy as np
+import pytest
+from color_converter import ColorConverter
+from color_graph import COLOR_GRAPH, hsv_to_rgb, rgb_to_cmyk
+
+# эталон - поэлементные функции ColorConverter: маршруты графа с RGB
+# должны округляться так же
+
+RNG = np.random.default_rng(7)
+RGB_SAMPLE = RNG.integers(0, 256, size=(20000, 3))
+HSV_SAMPLE = np.c_[RNG.integers(0, 361, 20000), RNG.integers(0, 101, (20000, 2))]
+CMYK_SAMPLE = RNG.integers(0, 101, size=(20000, 4))
+
+
+def scalar(function, values):
+    return np.array([function(*map(int, color)) for color in values])
+
+
+@pytest.mark.parametrize('source, target, function, sample', [
+    ('rgb', 'hsv', ColorConverter.rgb_to_hsv, RGB_SAMPLE),
+    ('rgb', 'cmyk', ColorConverter.rgb_to_cmyk, RGB_SAMPLE),
+    ('hsv', 'rgb', ColorConverter.hsv_to_rgb, HSV_SAMPLE),
+    ('cmyk', 'rgb', ColorConverter.cmyk_to_rgb, CMYK_SAMPLE),
+])
+def test_graph_matches_scalar(source, target, function, sample):
+    expected = scalar(function, sample)
+    np.testing.assert_array_equal(COLOR_GRAPH.convert(sample, source, target), expected)
+
+
+def test_cmyk_to_rgb_rounding_all_channel_pairs():
+    # канал rgb зависит только от пары (c, k): все 101 x 101 пар
+    pairs = np.array(list(itertools.product(range(101), repeat=2)))
+    cmyk = np.c_[pairs[:, :1], pairs[:, :1], pairs[:, :1], pairs[:, 1:]]
+    expected = scalar(ColorConverter.cmyk_to_rgb, cmyk)
+    np.testing.assert_array_equal(COLOR_GRAPH.convert(cmyk, 'cmyk', 'rgb'), expected)
+
+
+def test_single_color_matches_array():
+    for color in HSV_SAMPLE[:100]:
+        np.testing.assert_array_equal(COLOR_GRAPH.convert(tuple(color), 'hsv', 'cmyk'),
+                                      COLOR_GRAPH.convert(color[None], 'hsv', 'cmyk')[0])
+
+
+def test_fused_hsv_cmyk_matches_route_through_float_rgb():
+    # слитое ядро не округляет промежуточный RGB: сравниваем с цепочкой ядер во
+    # float, расхождение - только в округлении половин из-за порядка операций
+    unit = COLOR_GRAPH.spaces['hsv'].to_unit(HSV_SAMPLE)
+    expected = COLOR_GRAPH.spaces['cmyk'].from_unit(rgb_to_cmyk(hsv_to_rgb(unit)))
+    difference = np.abs(COLOR_GRAPH.convert(HSV_SAMPLE, 'hsv', 'cmyk').astype(int) - expected)
+    assert difference.max() <= 1
+
+
+def test_unknown_space():
+    with pytest.raises(KeyError):
+        COLOR_GRAPH.convert((0, 0, 0), 'rgb', 'yuv')
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from color_converter import ColorConverter
+from color_lut import ColorLUT
+
+RNG = np.random.default_rng(11)
+HSV_SAMPLE = np.c_[RNG.integers(0, 361, 20000), RNG.integers(0, 101, (20000, 2))]
+CMYK_SAMPLE = RNG.integers(0, 101, size=(20000, 4))
+
+
+@pytest.fixture
+def lut(tmp_path):
+    lut = ColorLUT(str(tmp_path))
+    yield lut
+    lut.close()
+
+
+def test_lut_matches_arrays(lut):
+    # таблицы rgb на 16 миллионов цветов строятся долго, проверяем остальные
+    np.testing.assert_array_equal(lut.hsv_to_rgb(HSV_SAMPLE), ColorConverter.hsv_to_rgb_array(HSV_SAMPLE))
+    np.testing.assert_array_equal(lut.cmyk_to_rgb(CMYK_SAMPLE), ColorConverter.cmyk_to_rgb_array(CMYK_SAMPLE))
+
+
+def test_lut_tables_reopened_from_disk(lut, tmp_path):
+    expected = lut.cmyk_to_rgb(CMYK_SAMPLE)
+    lut.close()
+    again = ColorLUT(str(tmp_path))
+    np.testing.assert_array_equal(again.cmyk_to_rgb(CMYK_SAMPLE), expected)
+    again.close()
+
+
+@pytest.mark.parametrize('values', [
+    [[0, 0, 101, 0]],
+    [[-1, 0, 0, 0]],
+    [[0, 0, 0]],
+])
+def test_lut_rejects_out_of_range(lut, values):
+    with pytest.raises(ValueError):
+        lut.cmyk_to_rgb(np.array(values))
+
+
+def test_lut_rejects_floats(lut):
+    with pytest.raises(TypeError):
+        lut.hsv_to_rgb(np.array([[0.5, 0, 0]]))
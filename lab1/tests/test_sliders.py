@@ -0,0 +1,16 @@
+from color_graph import convert
+from lab1 import ColorApp
+
+
+def test_switching_slider_groups_keeps_latest_input(app):
+    window = ColorApp()
+    # RGB сдвинут, но ещё не применён, и тут же двигают HSV: применение RGB
+    # не должно затереть новое значение V
+    window.rgb_sliders[0].setValue(200)
+    window.hsv_sliders[2].setValue(50)
+    assert window.hsv_sliders[2].value() == 50
+    window.flush_pending_update()
+    assert (window.h, window.s, window.v) == (0, 0, 50)
+    assert (window.r, window.g, window.b) == tuple(int(x) for x in convert((0, 0, 50), 'hsv', 'rgb'))
+    assert [slider.value() for slider in window.rgb_sliders] == [window.r, window.g, window.b]
+    window.close()
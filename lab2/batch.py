@@ -0,0 +1,135 @@
+import os
+import ast
+import sys
+import time
+import fnmatch
+import argparse
+# общие модули (common) лежат в корне репозитория; путь к нему добавляет
+# запущенный скрипт, модули, которые только импортируются, sys.path не меняют
+if __name__ == '__main__':
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import cv2
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from filters import FILTERS
+from result_cache import ResultCache
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+
+def parse_params(pairs):
+    params = {}
+    for pair in pairs:
+        key, _, value = pair.partition('=')
+        try:
+            params[key] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            params[key] = value
+    return params
+
+
+def output_path(path, root, filter_name, output_dir):
+    stem, _ = os.path.splitext(path)
+    name = f'{stem}_{filter_name}.png'
+    if output_dir is None:
+        return name
+    return os.path.join(output_dir, os.path.relpath(name, root))
+
+
+def is_result(path):
+    # результаты прошлых запусков лежат рядом с исходниками, их не фильтруем повторно
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return any(stem.endswith('_' + name) for name in FILTERS)
+
+
+def find_images(roots, pattern):
+    for root in roots:
+        for directory, subdirectories, files in os.walk(root):
+            subdirectories.sort()
+            if directory == root and pattern:
+                # шаблон отбирает подкаталоги верхнего уровня, файлы в самом корне пропускаются
+                subdirectories[:] = [name for name in subdirectories if fnmatch.fnmatch(name, pattern)]
+                continue
+            for name in sorted(files):
+                path = os.path.join(directory, name)
+                if name.lower().endswith(IMAGE_EXTENSIONS) and not is_result(path):
+                    yield root, path
+
+
+def process_image(path, result_path, filter_name, params, cache_dir=None):
+    start = time.perf_counter()
+    image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        return path, 0, time.perf_counter() - start, 'cannot read image', False
+
+    # дисковый кэш общий для всех процессов и запусков; память не нужна - каждое
+    # изображение процесс видит один раз
+    filtered_image = None
+    if cache_dir is not None:
+        cache = ResultCache(max_bytes=0, directory=cache_dir)
+        key = ResultCache.key(ResultCache.image_digest(image), filter_name, params)
+        filtered_image = cache.get(key)
+    hit = filtered_image is not None
+
+    if not hit:
+        filtered_image = FILTERS[filter_name](image, **params)
+        if cache_dir is not None:
+            cache.put(key, filtered_image)
+
+    os.makedirs(os.path.dirname(result_path) or '.', exist_ok=True)
+    # imwrite не бросает исключений, о неудаче говорит только False
+    if not cv2.imwrite(result_path, filtered_image):
+        return path, 0, time.perf_counter() - start, f'cannot write {result_path}', hit
+    return path, image.size, time.perf_counter() - start, None, hit
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply a lab2 filter to every image in a directory tree.')
+    parser.add_argument('roots', nargs='+', help='directories to walk')
+    parser.add_argument('--filter', choices=FILTERS, required=True)
+    parser.add_argument('--param', action='append', default=[], metavar='NAME=VALUE',
+                        help='filter parameter, e.g. window_size=15 (repeatable)')
+    parser.add_argument('--pattern', help="only descend into subdirectories matching this glob, e.g. '_good_*'")
+    parser.add_argument('--output-dir', help='mirror results here instead of writing them next to the sources')
+    parser.add_argument('--cache-dir', help='reuse results of earlier runs stored in this directory')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes')
+    args = parser.parse_args()
+
+    params = parse_params(args.param)
+    tasks = [(path, output_path(path, root, args.filter, args.output_dir))
+             for root, path in find_images(args.roots, args.pattern)]
+    if not tasks:
+        sys.exit('no images found')
+
+    failed = 0
+    hits = 0
+    pixels = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(process_image, path, result_path, args.filter, params, args.cache_dir): path
+                   for path, result_path in tasks}
+        for future in as_completed(futures):
+            # ошибка фильтра (например, неизвестный параметр) не прерывает остальные изображения
+            try:
+                path, size, seconds, error, hit = future.result()
+            except Exception as exception:
+                path, error = futures[future], f'{type(exception).__name__}: {exception}'
+            if error is not None:
+                failed += 1
+                print(f'{path}: {error}', file=sys.stderr)
+                continue
+            pixels += size
+            hits += hit
+            print(f'{path}: {size / 1e6:.2f} MP, {seconds * 1e3:.1f} ms{" (cached)" if hit else ""}')
+    elapsed = time.perf_counter() - start
+
+    done = len(tasks) - failed
+    print(f'{done} images, {pixels / 1e6:.1f} MP in {elapsed:.2f} s with {args.workers} workers: '
+          f'{done / elapsed:.2f} images/s, {pixels / 1e6 / elapsed:.2f} MP/s')
+    if args.cache_dir is not None:
+        print(f'cache: {hits} hits, {done - hits} misses')
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
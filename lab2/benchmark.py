@@ -0,0 +1,258 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+# общие модули (common) лежат в корне репозитория; путь к нему добавляет
+# запущенный скрипт, модули, которые только импортируются, sys.path не меняют
+if __name__ == '__main__':
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import cv2
+import numpy as np
+import skimage
+from filters import FILTERS
+from local_stats import LocalStatistics
+from tiled import apply_tiled, peak_rss_mb
+from parallel import apply_parallel
+from batch import find_images
+
+IMAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'images')
+
+
+# эталоны - исходные реализации из ImageFilterApp до оптимизаций
+
+def reference_niblack(image, window_size=15, k=-0.2):
+    thresh_niblack = skimage.filters.threshold_niblack(image, window_size=window_size, k=k)
+    return ((image > thresh_niblack) * 255).astype(np.uint8)
+
+
+def reference_sauvola(image, window_size=15, k=0.2):
+    thresh_sauvola = skimage.filters.threshold_sauvola(image, window_size=window_size, k=k)
+    return ((image > thresh_sauvola) * 255).astype(np.uint8)
+
+
+def reference_bernsen(image, window_size=10):
+    half_window = window_size // 2
+    filtered_image = np.zeros_like(image)
+
+    float_image = image.astype(np.float32)
+
+    for i in range(half_window, image.shape[0] - half_window):
+        for j in range(half_window, image.shape[1] - half_window):
+            local_region = float_image[i-half_window:i+half_window+1, j-half_window:j+half_window+1]
+
+            local_min = np.min(local_region)
+            local_max = np.max(local_region)
+
+            threshold = (local_min + local_max) / 2
+
+            filtered_image[i, j] = 255 if float_image[i, j] > threshold else 0
+
+    return filtered_image
+
+
+def reference_gradient(image):
+    grad_x = cv2.Sobel(image, cv2.CV_64F, 1, 0, ksize=3)
+    grad_y = cv2.Sobel(image, cv2.CV_64F, 0, 1, ksize=3)
+    grad = cv2.magnitude(grad_x, grad_y)
+    return cv2.normalize(grad, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+
+
+# фильтр -> (эталон, ширина рамки, где эталон не определён); исходный цикл
+# Бернсена не трогает пиксели ближе половины окна к краю
+REFERENCES = {
+    'niblack': (reference_niblack, 0),
+    'sauvola': (reference_sauvola, 0),
+    'bernsen': (reference_bernsen, 10 // 2),
+    'segmentation': (reference_gradient, 0),
+    'gradient': (reference_gradient, 0),
+}
+
+# другие реализации тех же фильтров: должны совпадать с FILTERS до бита
+VARIANTS = {
+    'niblack': {
+        'tiled': lambda image: apply_tiled(image, 'niblack', tile_size=512),
+        'parallel': lambda image: apply_parallel(image, 'niblack'),
+        'integral': lambda image: LocalStatistics(image).binarize('niblack', 15, -0.2),
+    },
+    'sauvola': {
+        'tiled': lambda image: apply_tiled(image, 'sauvola', tile_size=512),
+        'parallel': lambda image: apply_parallel(image, 'sauvola'),
+    },
+    'bernsen': {
+        'tiled': lambda image: apply_tiled(image, 'bernsen', tile_size=512),
+        'parallel': lambda image: apply_parallel(image, 'bernsen'),
+    },
+    'gradient': {
+        'tiled': lambda image: apply_tiled(image, 'gradient', tile_size=512),
+        'parallel': lambda image: apply_parallel(image, 'gradient'),
+    },
+}
+
+
+def synthetic_image(height, width, rng):
+    # плавный фон, тёмные штрихи и шум - похоже на скан страницы
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    image = 160 + 60 * np.sin(x / (width / 3)) * np.cos(y / (height / 2))
+    strokes = rng.random((height // 16 + 1, width // 16 + 1)) < 0.2
+    strokes = cv2.resize(strokes.astype(np.uint8), (width, height), interpolation=cv2.INTER_NEAREST)
+    image[strokes > 0] -= 110
+    image += rng.normal(0, 8, size=(height, width)).astype(np.float32)
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+
+def load_datasets(image_root, pattern, synthetic_sizes, rng):
+    # набор - подкаталог с изображениями или синтетическое изображение одного размера
+    datasets = {}
+    for root, path in find_images([image_root], pattern):
+        image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if image is not None:
+            name = os.path.relpath(os.path.dirname(path), root)
+            datasets.setdefault(name, []).append((os.path.basename(path), image))
+
+    for height, width in synthetic_sizes:
+        datasets[f'synthetic_{width}x{height}'] = [('synthetic', synthetic_image(height, width, rng))]
+    return datasets
+
+
+def measure(function, image, repeat):
+    # лучшее время из repeat запусков и пик памяти numpy-массивов отдельным
+    # запуском: под tracemalloc замеры времени были бы завышены
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(image)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    function(image)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def check_equivalence(filter_name, images, crop):
+    function = FILTERS[filter_name]
+    checks = {}
+
+    # эталон сравнивается на вырезке: исходный цикл Бернсена слишком медленный;
+    # у Вольфа эталона нет, он появился сразу в векторном виде
+    if filter_name in REFERENCES:
+        reference, border = REFERENCES[filter_name]
+        mismatched = 0
+        for _, image in images:
+            part = np.ascontiguousarray(image[:crop, :crop])
+            inner = (slice(border, part.shape[0] - border), slice(border, part.shape[1] - border))
+            mismatched += int((function(part)[inner] != reference(part)[inner]).sum())
+        checks['reference'] = mismatched
+
+    for variant_name, variant in VARIANTS.get(filter_name, {}).items():
+        checks[variant_name] = sum(int((variant(image) != function(image)).sum()) for _, image in images)
+    return checks
+
+
+def benchmark_filter(filter_name, images, repeat, crop):
+    seconds = 0.0
+    peak = 0
+    per_image = {}
+    for name, image in images:
+        elapsed, image_peak = measure(FILTERS[filter_name], image, repeat)
+        per_image[name] = elapsed
+        seconds += elapsed
+        peak = max(peak, image_peak)
+
+    megapixels = sum(image.size for _, image in images) / 1e6
+    mismatched = check_equivalence(filter_name, images, crop)
+    return {
+        'images': len(images),
+        'megapixels': megapixels,
+        'seconds': seconds,
+        'megapixels_per_second': megapixels / seconds,
+        'peak_traced_mb': peak / 2 ** 20,
+        'per_image_seconds': per_image,
+        'mismatched_pixels': mismatched,
+        'equivalent': not any(mismatched.values()),
+    }
+
+
+def find_regressions(results, baseline, threshold):
+    # сравниваются только пары фильтр/набор, которые есть в обоих отчётах
+    regressions = []
+    for filter_name, datasets in results.items():
+        for dataset, result in datasets.items():
+            old = baseline.get('filters', {}).get(filter_name, {}).get(dataset)
+            if old is None:
+                continue
+            slowdown = result['seconds'] / old['seconds'] - 1
+            if slowdown > threshold:
+                regressions.append({
+                    'filter': filter_name,
+                    'dataset': dataset,
+                    'baseline_seconds': old['seconds'],
+                    'seconds': result['seconds'],
+                    'slowdown': slowdown,
+                })
+    return regressions
+
+
+def parse_size(text):
+    width, _, height = text.partition('x')
+    return int(height), int(width)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='lab2 filter speed, memory and equivalence benchmark.')
+    parser.add_argument('--filters', nargs='+', choices=FILTERS, default=list(FILTERS))
+    parser.add_argument('--images', default=IMAGES_DIR, help='directory with image sets (default: bundled images)')
+    parser.add_argument('--pattern', default=None, help='only image sets matching this pattern, e.g. "_good_*"')
+    parser.add_argument('--synthetic', nargs='*', type=parse_size, default=[(2048, 2048), (4096, 4096)],
+                        metavar='WIDTHxHEIGHT', help='sizes of synthetic images')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per measurement, best is reported')
+    parser.add_argument('--reference-crop', type=int, default=256,
+                        help='side of the crop compared against the reference implementations')
+    parser.add_argument('--baseline', help='baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed slowdown against the baseline, as a fraction')
+    parser.add_argument('--output', help='write JSON here instead of stdout')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    datasets = load_datasets(args.images, args.pattern, args.synthetic, rng)
+
+    report = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'skimage': skimage.__version__,
+        'machine': platform.machine(),
+        'filters': {},
+    }
+    for filter_name in args.filters:
+        report['filters'][filter_name] = {}
+        for dataset, images in datasets.items():
+            report['filters'][filter_name][dataset] = benchmark_filter(
+                filter_name, images, args.repeat, args.reference_crop)
+    # None там, где resource недоступен (Windows)
+    report['peak_rss_mb'] = peak_rss_mb()
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        report['regressions'] = find_regressions(report['filters'], baseline, args.threshold)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(text + '\n')
+    else:
+        print(text)
+
+    equivalent = all(result['equivalent'] for results in report['filters'].values()
+                     for result in results.values())
+    sys.exit(0 if equivalent and not report.get('regressions') else 1)
+
+
+if __name__ == '__main__':
+    main()
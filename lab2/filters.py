@@ -0,0 +1,121 @@
+import cv2
+import numpy as np
+import skimage
+from local_stats import LocalStatistics
+from segmentation import SegmentationPipeline
+from common.profiling import profiled, pixels
+
+
+def running_extreme(image, window, axis, ufunc):
+    # скользящий минимум/максимум ван Херка - Гиль-Вермана: префиксные и
+    # суффиксные экстремумы в блоках длины window, по три операции на пиксель
+    # независимо от размера окна; края дополняются повтором крайних значений
+    image = np.moveaxis(image, axis, 0)
+    n = image.shape[0]
+    half = window // 2
+
+    length = -(-(n + 2 * half) // window) * window
+    padded = np.pad(image, [(half, length - n - half)] + [(0, 0)] * (image.ndim - 1), mode='edge')
+
+    blocks = padded.reshape((length // window, window) + image.shape[1:])
+    prefix = ufunc.accumulate(blocks, axis=1).reshape(padded.shape)
+    suffix = ufunc.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].reshape(padded.shape)
+
+    result = ufunc(suffix[:n], prefix[window - 1:window - 1 + n])
+    return np.moveaxis(result, 0, axis)
+
+
+def running_min(image, window):
+    return running_extreme(running_extreme(image, window, 0, np.minimum), window, 1, np.minimum)
+
+
+def running_max(image, window):
+    return running_extreme(running_extreme(image, window, 0, np.maximum), window, 1, np.maximum)
+
+
+class ImageFilters:
+    @staticmethod
+    @profiled('ImageFilters.niblack', size=pixels)
+    def niblack(image, window_size=15, k=-0.2):
+        thresh_niblack = skimage.filters.threshold_niblack(image, window_size=window_size, k=k)
+        binary_niblack = image > thresh_niblack
+        return (binary_niblack * 255).astype(np.uint8)
+
+    @staticmethod
+    @profiled('ImageFilters.sauvola', size=pixels)
+    def sauvola(image, window_size=15, k=0.2):
+        return LocalStatistics(image, max_window=window_size).binarize('sauvola', window_size, k)
+
+    @staticmethod
+    @profiled('ImageFilters.wolf', size=pixels)
+    def wolf(image, window_size=15, k=0.5):
+        return LocalStatistics(image, max_window=window_size).binarize('wolf', window_size, k)
+
+    @staticmethod
+    @profiled('ImageFilters.bernsen', size=pixels)
+    def bernsen(image, window_size=10, contrast_threshold=0):
+        # окно от i - window_size // 2 до i + window_size // 2 включительно,
+        # у краёв изображения окно обрезается
+        window = window_size // 2 * 2 + 1
+        local_min = running_min(image, window).astype(np.int16)
+        local_max = running_max(image, window).astype(np.int16)
+
+        # image > (min + max) / 2 без перехода к float
+        middle = local_min + local_max
+        filtered_image = np.where(2 * image.astype(np.int16) > middle, 255, 0).astype(np.uint8)
+
+        # в малоконтрастных окнах весь участок относится к одному классу
+        if contrast_threshold > 0:
+            low_contrast = local_max - local_min < contrast_threshold
+            filtered_image[low_contrast] = np.where(middle[low_contrast] >= 256, 255, 0)
+
+        return filtered_image
+
+    @staticmethod
+    @profiled('ImageFilters.segmentation', size=pixels)
+    def segmentation(image, overlays=(), base='gradient'):
+        # считаются только этапы, от которых зависят выбранные наложения
+        return SegmentationPipeline(image).composite(overlays, base)
+
+    @staticmethod
+    @profiled('ImageFilters.gradient_magnitude', size=pixels)
+    def gradient_magnitude(image):
+        grad_x = cv2.Sobel(image, cv2.CV_64F, 1, 0, ksize=3)
+        grad_y = cv2.Sobel(image, cv2.CV_64F, 0, 1, ksize=3)
+        return cv2.magnitude(grad_x, grad_y)
+
+    @staticmethod
+    @profiled('ImageFilters.gradient', size=pixels)
+    def gradient(image):
+        grad = ImageFilters.gradient_magnitude(image)
+        return cv2.normalize(grad, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+
+    @staticmethod
+    @profiled('ImageFilters.normalize_gradient', size=pixels)
+    def normalize_gradient(grad, grad_min, grad_max):
+        # то же, что cv2.normalize(..., NORM_MINMAX), но с заранее известными
+        # min/max всего изображения; формула повторяет OpenCV до бита
+        scale = 255 * (1.0 / (grad_max - grad_min)) if grad_max - grad_min > np.finfo(np.float64).eps else 0.0
+        shift = 0 - grad_min * scale
+        return (grad * scale + shift).astype(np.uint8)
+
+
+FILTERS = {
+    'niblack': ImageFilters.niblack,
+    'sauvola': ImageFilters.sauvola,
+    'wolf': ImageFilters.wolf,
+    'bernsen': ImageFilters.bernsen,
+    'segmentation': ImageFilters.segmentation,
+    'gradient': ImageFilters.gradient,
+}
+
+
+def preview_params(filter_name, params, factor):
+    # окно уменьшается вместе с изображением, чтобы превью было похоже на результат
+    params = dict(params)
+    if 'window_size' in params:
+        window = max(3, round(params['window_size'] / factor))
+        if filter_name != 'bernsen':
+            window |= 1
+        params['window_size'] = window
+    return params
@@ -1,12 +1,26 @@
+import os
 import sys
+# общие модули (common) лежат в корне репозитория; путь к нему добавляет
+# запущенный скрипт, модули, которые только импортируются, sys.path не меняют
+if __name__ == '__main__':
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 import cv2
-import numpy as np
-import skimage
-import os
-from PyQt5.QtWidgets import (QApplication, QMainWindow, QLabel, QPushButton,
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QLabel, QPushButton, QProgressBar, QSlider, QCheckBox,
                              QFileDialog, QVBoxLayout, QWidget, QHBoxLayout, QRadioButton, QButtonGroup)
 from PyQt5.QtGui import QPixmap, QImage
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer
+from filters import FILTERS, preview_params
+from common.profiling import profiled
+from common.overlay import attach_overlay
+from local_stats import LocalStatistics
+from result_cache import ResultCache
+from worker import FilterWorker
+
+# фильтры на локальной статистике, которые пересчитываются прямо при движении слайдеров
+LOCAL_METHODS = ('niblack', 'sauvola', 'wolf')
+
+# пауза в мс, после которой превью заменяется полным результатом
+FULL_DELAY = 300
 
 
 class ImageFilterApp(QMainWindow):
@@ -30,17 +44,63 @@ class ImageFilterApp(QMainWindow):
 
         self.niblack_radio = QRadioButton("Niblack", self)
         self.niblack_radio.setChecked(True)
+        self.sauvola_radio = QRadioButton("Sauvola", self)
+        self.wolf_radio = QRadioButton("Wolf", self)
         self.bernsen_radio = QRadioButton("Bernsen", self)
         self.segmentation_radio = QRadioButton("Segmentation", self)
 
+        # наложения для сегментации поверх модуля градиента или исходного изображения
+        self.contours_check = QCheckBox("Contours", self)
+        self.corners_check = QCheckBox("Corners", self)
+        self.original_base_check = QCheckBox("Over original", self)
+
         self.filter_group = QButtonGroup(self)
         self.filter_group.addButton(self.niblack_radio)
+        self.filter_group.addButton(self.sauvola_radio)
+        self.filter_group.addButton(self.wolf_radio)
         self.filter_group.addButton(self.bernsen_radio)
         self.filter_group.addButton(self.segmentation_radio)
 
+        # окно = 2 * значение + 1, k = значение / 100
+        self.window_slider = QSlider(Qt.Horizontal, self)
+        self.window_slider.setRange(1, 50)
+        self.window_slider.setValue(7)
+        self.window_slider.valueChanged.connect(self.threshold_parameters_changed)
+        self.window_slider.sliderReleased.connect(self.threshold_slider_released)
+        self.window_label = QLabel(self)
+
+        self.k_slider = QSlider(Qt.Horizontal, self)
+        self.k_slider.setRange(-100, 100)
+        self.k_slider.setValue(-20)
+        self.k_slider.valueChanged.connect(self.threshold_parameters_changed)
+        self.k_slider.sliderReleased.connect(self.threshold_slider_released)
+        self.k_label = QLabel(self)
+        self.update_parameter_labels()
+
+        self.rethreshold_timer = QTimer(self)
+        self.rethreshold_timer.setSingleShot(True)
+        self.rethreshold_timer.setInterval(16)
+        self.rethreshold_timer.timeout.connect(self.rethreshold)
+
+        # в режиме превью полное изображение считается, когда ползунок
+        # отпущен или параметры не меняются FULL_DELAY мс
+        self.full_threshold_timer = QTimer(self)
+        self.full_threshold_timer.setSingleShot(True)
+        self.full_threshold_timer.setInterval(FULL_DELAY)
+        self.full_threshold_timer.timeout.connect(self.full_threshold_timeout)
+
+        self.preview_check = QCheckBox("Preview first", self)
+        self.preview_check.setChecked(True)
+
         self.apply_button = QPushButton("Apply filter", self)
         self.apply_button.clicked.connect(self.apply_filter)
 
+        self.progress_bar = QProgressBar(self)
+        self.progress_bar.setVisible(False)
+        self.cancel_button = QPushButton("Cancel", self)
+        self.cancel_button.clicked.connect(self.cancel_filter)
+        self.cancel_button.setVisible(False)
+
         self.save_button = QPushButton("Save filtered image", self)
         self.save_button.clicked.connect(self.save_image)
         self.save_button.setEnabled(False)  
@@ -54,11 +114,30 @@ class ImageFilterApp(QMainWindow):
 
         radio_layout = QHBoxLayout()
         radio_layout.addWidget(self.niblack_radio)
+        radio_layout.addWidget(self.sauvola_radio)
+        radio_layout.addWidget(self.wolf_radio)
         radio_layout.addWidget(self.bernsen_radio)
         radio_layout.addWidget(self.segmentation_radio)
+        radio_layout.addWidget(self.contours_check)
+        radio_layout.addWidget(self.corners_check)
+        radio_layout.addWidget(self.original_base_check)
 
         control_layout.addLayout(radio_layout)
+
+        parameters_layout = QHBoxLayout()
+        parameters_layout.addWidget(self.window_label)
+        parameters_layout.addWidget(self.window_slider)
+        parameters_layout.addWidget(self.k_label)
+        parameters_layout.addWidget(self.k_slider)
+        control_layout.addLayout(parameters_layout)
+        control_layout.addWidget(self.preview_check)
         control_layout.addWidget(self.apply_button)
+
+        progress_layout = QHBoxLayout()
+        progress_layout.addWidget(self.progress_bar)
+        progress_layout.addWidget(self.cancel_button)
+        control_layout.addLayout(progress_layout)
+
         control_layout.addWidget(self.save_button)
 
         main_layout = QVBoxLayout()
@@ -69,13 +148,38 @@ class ImageFilterApp(QMainWindow):
 
         self.original_image = None
         self.filtered_image = None
+        # интегральные изображения загруженного изображения, строятся при первом пересчёте
+        self.local_stats = None
+
+        # уменьшенные копии по коэффициенту и их интегральные изображения
+        self.previews = {}
+        self.preview_stats = {}
+
+        # результаты по хэшу содержимого изображения, фильтру и параметрам
+        self.result_cache = ResultCache()
+        self.image_digest = None
+        self.job_key = None
+
+        # фильтры считаются в фоновом потоке; job - номер последнего задания
+        self.job = 0
+        self.worker = None
+        self.workers = []
+
+        # время отрисовки и фильтров поверх окна, если включено CG_PROFILE_OVERLAY
+        self.profile_overlay = attach_overlay(self)
 
     def load_image(self):
         image_path, _ = QFileDialog.getOpenFileName(self, "Open image", os.getcwd(), "Image files (*.png *.jpg *.bmp)")
         if image_path:
+            self.cancel_filter()
             self.original_image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+            self.local_stats = None
+            self.previews = {}
+            self.preview_stats = {}
+            self.image_digest = ResultCache.image_digest(self.original_image)
             self.display_image(self.original_image, self.original_image_label)
 
+    @profiled('ImageFilterApp.display_image', category='paint', size=lambda result, self, image, label: image.size)
     def display_image(self, image, label):
         height, width = image.shape
         bytes_per_line = width
@@ -90,58 +194,189 @@ class ImageFilterApp(QMainWindow):
             if save_path:
                 cv2.imwrite(save_path, self.filtered_image)
 
-    def apply_filter(self):
-        if self.original_image is None:
+    def threshold_window(self):
+        return 2 * self.window_slider.value() + 1
+
+    def threshold_k(self):
+        return self.k_slider.value() / 100
+
+    def update_parameter_labels(self):
+        self.window_label.setText(f"Window: {self.threshold_window()}")
+        self.k_label.setText(f"k: {self.threshold_k():.2f}")
+
+    def selected_filter(self):
+        for name, radio in (('niblack', self.niblack_radio), ('sauvola', self.sauvola_radio),
+                            ('wolf', self.wolf_radio)):
+            if radio.isChecked():
+                return name, {'window_size': self.threshold_window(), 'k': self.threshold_k()}
+        if self.bernsen_radio.isChecked():
+            return 'bernsen', {'window_size': 10, 'contrast_threshold': 0}
+        overlays = tuple(name for name, check in (('contours', self.contours_check),
+                                                  ('corners', self.corners_check)) if check.isChecked())
+        base = 'original' if self.original_base_check.isChecked() else 'gradient'
+        return 'segmentation', {'overlays': overlays, 'base': base}
+
+    def threshold_parameters_changed(self):
+        self.update_parameter_labels()
+        if not self.rethreshold_timer.isActive():
+            self.rethreshold_timer.start()
+
+    def rethreshold(self):
+        # пересчёт по закэшированным суммам: при смене k это только арифметика
+        filter_name, params = self.selected_filter()
+        if self.original_image is None or filter_name not in LOCAL_METHODS:
             return
 
-        if self.niblack_radio.isChecked():
-            self.apply_niblack()
-        elif self.bernsen_radio.isChecked():
-            self.apply_bernsen()
-        elif self.segmentation_radio.isChecked():
-            self.apply_segmentation()
-
-        self.display_image(self.filtered_image, self.filtered_image_label)
-        self.save_button.setEnabled(True)
-
-    def apply_niblack(self):
-        thresh_niblack = skimage.filters.threshold_niblack(self.original_image, window_size=15, k=-0.2)
-        binary_niblack = self.original_image > thresh_niblack
-        self.filtered_image = (binary_niblack * 255).astype(np.uint8) 
+        self.cancel_filter()
+        self.job += 1
+        key = ResultCache.key(self.image_digest, filter_name, params)
+        image = self.result_cache.get(key)
+        if image is None and self.preview_check.isChecked() and self.preview_factor() > 1:
+            # каждое движение ползунка - только уменьшенная копия по её суммам,
+            # без нового потока; полный результат - позже, одним заданием
+            self.show_preview(filter_name, params)
+            self.full_threshold_timer.start()
+            return
 
-    def apply_bernsen(self):
-        window_size = 10
-        half_window = window_size // 2
-        self.filtered_image = np.zeros_like(self.original_image)
+        if image is None:
+            if self.local_stats is None:
+                self.local_stats = LocalStatistics(self.original_image)
+            image = self.local_stats.binarize(filter_name, params['window_size'], params['k'])
+            self.result_cache.put(key, image)
+        self.show_filtered_image(image)
+
+    def threshold_slider_released(self):
+        # последнее значение ещё могло не дойти до rethreshold
+        if self.rethreshold_timer.isActive():
+            self.rethreshold_timer.stop()
+            self.rethreshold()
+        if self.full_threshold_timer.isActive():
+            self.start_full_threshold()
+
+    def full_threshold_timeout(self):
+        # пока ползунок держат, ждём, когда его отпустят
+        if not (self.window_slider.isSliderDown() or self.k_slider.isSliderDown()):
+            self.start_full_threshold()
+
+    def start_full_threshold(self):
+        filter_name, params = self.selected_filter()
+        if self.original_image is not None and filter_name in LOCAL_METHODS:
+            self.start_filter(filter_name, params)
+
+    def preview_factor(self):
+        # наибольшее уменьшение в степень двойки, при котором превью не мельче подписи
+        label = self.filtered_image_label
+        height, width = self.original_image.shape
+        factor = 1
+        while factor < 8 and width // (2 * factor) >= label.width() and height // (2 * factor) >= label.height():
+            factor *= 2
+        return factor
+
+    def preview_image(self, factor):
+        if factor not in self.previews:
+            height, width = self.original_image.shape
+            self.previews[factor] = cv2.resize(self.original_image, (width // factor, height // factor),
+                                               interpolation=cv2.INTER_AREA)
+        return self.previews[factor]
+
+    def show_preview(self, filter_name, params):
+        factor = self.preview_factor()
+        if factor == 1:
+            return
+        preview = self.preview_image(factor)
+        params = preview_params(filter_name, params, factor)
 
-        float_image = self.original_image.astype(np.float32)
+        if filter_name in LOCAL_METHODS:
+            if factor not in self.preview_stats:
+                self.preview_stats[factor] = LocalStatistics(preview)
+            result = self.preview_stats[factor].binarize(filter_name, params['window_size'], params['k'])
+        else:
+            result = FILTERS[filter_name](preview, **params)
+        self.display_image(result, self.filtered_image_label)
 
-        for i in range(half_window, self.original_image.shape[0] - half_window):
-            for j in range(half_window, self.original_image.shape[1] - half_window):
-                local_region = float_image[i-half_window:i+half_window+1, j-half_window:j+half_window+1]
+    def apply_filter(self):
+        if self.original_image is None:
+            return
+        filter_name, params = self.selected_filter()
+        self.start_filter(filter_name, params, preview=self.preview_check.isChecked())
+
+    def start_filter(self, filter_name, params, preview=False):
+        # новое задание вытесняет незаконченное
+        self.cancel_filter()
+        self.job += 1
+
+        self.job_key = ResultCache.key(self.image_digest, filter_name, params)
+        cached = self.result_cache.get(self.job_key)
+        if cached is not None:
+            self.show_filtered_image(cached)
+            return
 
-                local_min = np.min(local_region)
-                local_max = np.max(local_region)
+        # сразу показываем результат на уменьшенной копии, полный считается в фоне
+        if preview:
+            self.show_preview(filter_name, params)
+
+        worker = FilterWorker(self.job, self.original_image, filter_name, params, self)
+        worker.progress.connect(self.filter_progress)
+        worker.finished_image.connect(self.filter_finished)
+        worker.failed.connect(self.filter_failed)
+        worker.finished.connect(lambda: self.forget_worker(worker))
+        self.workers.append(worker)
+        self.worker = worker
+
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.setVisible(True)
+        self.cancel_button.setVisible(True)
+        self.worker.start()
+
+    def cancel_filter(self):
+        self.full_threshold_timer.stop()
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker = None
+        self.progress_bar.setVisible(False)
+        self.cancel_button.setVisible(False)
+
+    def forget_worker(self, worker):
+        # отменённые потоки держим, пока они не завершатся сами, затем
+        # удаляем вместе с объектом Qt, иначе они копятся у окна
+        if worker in self.workers:
+            self.workers.remove(worker)
+        worker.deleteLater()
+
+    def filter_progress(self, job, done, total):
+        if job == self.job:
+            self.progress_bar.setRange(0, total)
+            self.progress_bar.setValue(done)
+
+    def filter_finished(self, job, image):
+        if job != self.job:
+            return
+        self.worker = None
+        self.progress_bar.setVisible(False)
+        self.cancel_button.setVisible(False)
 
-                threshold = (local_min + local_max) / 2
+        self.result_cache.put(self.job_key, image)
+        self.show_filtered_image(image)
 
-                self.filtered_image[i, j] = 255 if float_image[i, j] > threshold else 0
+    def show_filtered_image(self, image):
+        self.filtered_image = image
+        self.display_image(self.filtered_image, self.filtered_image_label)
+        self.save_button.setEnabled(True)
 
-    def apply_segmentation(self):
-        self.filtered_image = np.copy(self.original_image)
-        edges = cv2.Canny(self.original_image, 50, 150)
-        contours, _ = cv2.findContours(edges, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-        cv2.drawContours(self.filtered_image, contours, -1, (255, 255, 255), 2)
+        stats = self.result_cache.stats()
+        self.statusBar().showMessage(f"Cache: {stats['hits']} hits, {stats['misses']} misses, "
+                                     f"{stats['entries']} results, {stats['bytes'] / 2 ** 20:.1f} MB")
 
-        gray = np.float32(self.original_image)
-        dst = cv2.cornerHarris(gray, blockSize=2, ksize=3, k=0.04)
-        dst = cv2.dilate(dst, None)
-        self.filtered_image[dst > 0.01 * dst.max()] = 255
+    def filter_failed(self, job, message):
+        if job == self.job:
+            self.cancel_filter()
+            self.statusBar().showMessage(f"Filter failed: {message}")
 
-        grad_x = cv2.Sobel(self.original_image, cv2.CV_64F, 1, 0, ksize=3)
-        grad_y = cv2.Sobel(self.original_image, cv2.CV_64F, 0, 1, ksize=3)
-        grad = cv2.magnitude(grad_x, grad_y)
-        self.filtered_image = cv2.normalize(grad, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+    def closeEvent(self, event):
+        self.cancel_filter()
+        for worker in self.workers:
+            worker.wait()
+        super().closeEvent(event)
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
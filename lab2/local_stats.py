@@ -0,0 +1,79 @@
+import numpy as np
+
+
+def integral_image(image):
+    # интегральное изображение с нулевой первой строкой и столбцом
+    integral = np.zeros((image.shape[0] + 1, image.shape[1] + 1), dtype=np.float64)
+    np.cumsum(image, axis=0, out=integral[1:, 1:])
+    np.cumsum(integral[1:, 1:], axis=1, out=integral[1:, 1:])
+    return integral
+
+
+class LocalStatistics:
+    # интегральные изображения I и I^2 строятся один раз на изображение;
+    # среднее и отклонение для любого окна - четыре обращения на пиксель.
+    # Края дополняются отражением, как в skimage, а суммы целых яркостей
+    # во float64 точны, поэтому пороги совпадают с skimage.filters до бита.
+    # Память: два интеграла по 8 байт на пиксель дополненного изображения и
+    # среднее с отклонением последнего окна ещё 16 - около 32 байт на
+    # пиксель, для 24 Мп примерно 770 МБ
+    def __init__(self, image, max_window=101):
+        self.image = image
+        self.window = None
+        self.build(max_window)
+
+        info = np.iinfo(image.dtype) if np.issubdtype(image.dtype, np.integer) else None
+        self.dynamic_range = 0.5 * (info.max - info.min) if info is not None else 0.5
+
+    def build(self, max_window):
+        self.pad = max_window // 2 + 1
+        padded = np.pad(self.image.astype(np.float64), self.pad, mode='reflect')
+        self.integral = integral_image(padded)
+        padded *= padded
+        self.integral_sq = integral_image(padded)
+        self.window = None
+
+    def window_sums(self, integral, window):
+        height, width = self.image.shape
+        lo = self.pad - window // 2
+        hi = self.pad + window // 2 + 1
+        return (integral[hi:hi + height, hi:hi + width] - integral[lo:lo + height, hi:hi + width]
+                - integral[hi:hi + height, lo:lo + width] + integral[lo:lo + height, lo:lo + width])
+
+    def mean_std(self, window):
+        if window % 2 == 0 or window < 1:
+            raise ValueError('window must be a positive odd integer')
+        if window == self.window:
+            return self.mean, self.std
+        if window // 2 >= self.pad:
+            self.build(window)
+
+        count = window * window
+        mean = self.window_sums(self.integral, window) / count
+        mean_sq = self.window_sums(self.integral_sq, window) / count
+        std = np.sqrt(np.clip(mean_sq - mean * mean, 0, None))
+
+        # при перетаскивании k окно не меняется, и хватает одного последнего:
+        # каждое лишнее окно - ещё 16 байт на пиксель
+        self.window, self.mean, self.std = window, mean, std
+        return mean, std
+
+    def niblack(self, window=15, k=0.2):
+        mean, std = self.mean_std(window)
+        return mean - k * std
+
+    def sauvola(self, window=15, k=0.2, r=None):
+        mean, std = self.mean_std(window)
+        r = self.dynamic_range if r is None else r
+        return mean * (1 + k * ((std / r) - 1))
+
+    def wolf(self, window=15, k=0.5):
+        # Wolf-Jolion: нормировка по минимальной яркости и наибольшему отклонению
+        mean, std = self.mean_std(window)
+        image_min = float(self.image.min())
+        max_std = float(std.max()) or 1.0
+        return (1 - k) * mean + k * image_min + k * (std / max_std) * (mean - image_min)
+
+    def binarize(self, method, window=15, k=0.2):
+        threshold = getattr(self, method)(window, k)
+        return np.where(self.image > threshold, 255, 0).astype(np.uint8)
@@ -0,0 +1,133 @@
+import os
+import sys
+import time
+import argparse
+import contextlib
+# общие модули (common) лежат в корне репозитория; путь к нему добавляет
+# запущенный скрипт, модули, которые только импортируются, sys.path не меняют
+if __name__ == '__main__':
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import cv2
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from filters import FILTERS, ImageFilters
+from tiled import TILED_FILTERS, read_tile
+from batch import parse_params
+from common.profiling import profiled, pixels
+
+
+def band_boxes(height, width, bands):
+    # полосы почти равной высоты на всю ширину изображения
+    edges = np.linspace(0, height, min(bands, height) + 1).astype(int)
+    return [(y0, y1, 0, width) for y0, y1 in zip(edges[:-1], edges[1:])]
+
+
+@profiled('apply_parallel', size=pixels)
+def apply_parallel(image, filter_name, out=None, workers=None, bands=None, progress=None, executor=None,
+                   **params):
+    # полосы с перекрытием, как тайлы в apply_tiled, считаются в пуле потоков:
+    # OpenCV и NumPy отпускают GIL на больших массивах. Для серии изображений
+    # (кадры видео) пул можно создать один раз и передать в executor, тогда
+    # workers задаёт только число полос
+    function, halo = TILED_FILTERS[filter_name]
+    halo = halo(**params)
+    workers = workers or os.cpu_count()
+    if out is None:
+        out = np.empty(image.shape[:2], dtype=np.uint8)
+
+    boxes = band_boxes(image.shape[0], image.shape[1], bands or 2 * workers)
+    passes = 2 if filter_name == 'gradient' else 1
+    total = passes * len(boxes)
+
+    def filter_band(box):
+        y0, y1, x0, x1 = box
+        tile, inner = read_tile(image, box, halo)
+        out[y0:y1, x0:x1] = function(tile, **params)[inner]
+
+    def gradient_band(box):
+        tile, inner = read_tile(image, box, halo)
+        return function(tile)[inner]
+
+    def normalize_band(box, grad, grad_min, grad_max):
+        y0, y1, x0, x1 = box
+        out[y0:y1, x0:x1] = ImageFilters.normalize_gradient(grad, grad_min, grad_max)
+
+    if executor is None:
+        pool = ThreadPoolExecutor(max_workers=workers)
+    else:
+        # чужой пул не закрываем
+        pool = contextlib.nullcontext(executor)
+    with pool as executor:
+        def run(futures, done):
+            # прогресс и отмена - в вызывающем потоке, по мере готовности полос;
+            # при исключении ещё не начатые полосы снимаются
+            try:
+                for done, future in enumerate(as_completed(futures), done + 1):
+                    future.result()
+                    if progress is not None:
+                        progress(done, total)
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+            return done
+
+        if filter_name != 'gradient':
+            run([executor.submit(filter_band, box) for box in boxes], 0)
+            return out
+
+        # модуль градиента полос остаётся в памяти между проходами: в отличие
+        # от apply_tiled изображение и так целиком в памяти
+        futures = [executor.submit(gradient_band, box) for box in boxes]
+        done = run(futures, 0)
+        grads = [future.result() for future in futures]
+        grad_min = min(grad.min() for grad in grads)
+        grad_max = max(grad.max() for grad in grads)
+        run([executor.submit(normalize_band, box, grad, grad_min, grad_max)
+             for box, grad in zip(boxes, grads)], done)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure band-parallel scaling of a lab2 filter on one image.')
+    parser.add_argument('input', help='image file or .npy array')
+    parser.add_argument('--filter', choices=TILED_FILTERS, required=True)
+    parser.add_argument('--param', action='append', default=[], metavar='NAME=VALUE',
+                        help='filter parameter, e.g. window_size=15 (repeatable)')
+    parser.add_argument('--workers', type=int, nargs='+', default=None,
+                        help='worker counts to try (default: 1, 2, 4, ... up to the core count)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per worker count, best is reported')
+    args = parser.parse_args()
+
+    if args.input.lower().endswith('.npy'):
+        image = np.load(args.input)
+    else:
+        image = cv2.imread(args.input, cv2.IMREAD_GRAYSCALE)
+    if image is None or image.ndim != 2:
+        sys.exit(f'cannot read a grayscale image from {args.input}')
+
+    workers = args.workers
+    if workers is None:
+        workers = [1 << i for i in range(os.cpu_count().bit_length()) if 1 << i <= os.cpu_count()]
+        if workers[-1] != os.cpu_count():
+            workers.append(os.cpu_count())
+
+    params = parse_params(args.param)
+    reference = FILTERS[args.filter](image, **params)
+    megapixels = image.size / 1e6
+    single = None
+    for count in workers:
+        best = float('inf')
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = apply_parallel(image, args.filter, workers=count, **params)
+            best = min(best, time.perf_counter() - start)
+        single = single or best
+
+        status = 'ok' if np.array_equal(result, reference) else 'MISMATCH'
+        print(f'{count} workers: {best * 1e3:.1f} ms, {megapixels / best:.1f} MP/s, '
+              f'speedup {single / best:.2f}x, {status}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+import os
+import hashlib
+import tempfile
+from collections import OrderedDict
+import numpy as np
+
+
+class ResultCache:
+    # результаты фильтров по ключу "содержимое изображения + фильтр + параметры":
+    # LRU в памяти с ограничением по байтам и необязательный уровень на диске
+    def __init__(self, max_bytes=256 * 1024 * 1024, directory=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.size = 0
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def image_digest(image):
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(f'{image.shape}:{image.dtype.str}'.encode())
+        digest.update(np.ascontiguousarray(image).data)
+        return digest.hexdigest()
+
+    @staticmethod
+    def key(image_digest, filter_name, params):
+        return hashlib.blake2b(f'{image_digest}:{filter_name}:{sorted(params.items())}'.encode(),
+                               digest_size=20).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.npy')
+
+    def get(self, key):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+
+        if self.directory is not None and os.path.exists(self.path(key)):
+            result = np.load(self.path(key))
+            self.remember(key, result)
+            self.disk_hits += 1
+            return result
+
+        self.misses += 1
+        return None
+
+    def put(self, key, result):
+        self.remember(key, result)
+        if self.directory is not None and not os.path.exists(self.path(key)):
+            # запись через временный файл, чтобы параллельные процессы не читали недописанное
+            fd, tmp_path = tempfile.mkstemp(suffix='.npy', dir=self.directory)
+            with os.fdopen(fd, 'wb') as file:
+                np.save(file, result)
+            os.replace(tmp_path, self.path(key))
+
+    def remember(self, key, result):
+        if result.nbytes > self.max_bytes:
+            return
+        if key in self.entries:
+            self.size -= self.entries.pop(key).nbytes
+
+        # результат отдаётся нескольким владельцам, поэтому запрещаем запись в него
+        result.setflags(write=False)
+        self.entries[key] = result
+        self.size += result.nbytes
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= evicted.nbytes
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'entries': len(self.entries),
+            'bytes': self.size,
+        }
@@ -0,0 +1,70 @@
+import cv2
+import numpy as np
+
+OVERLAYS = ('contours', 'corners')
+BASES = ('gradient', 'original')
+
+
+def sobel(image, border=cv2.BORDER_REFLECT_101):
+    return (cv2.Sobel(image, cv2.CV_16S, 1, 0, ksize=3, borderType=border),
+            cv2.Sobel(image, cv2.CV_16S, 0, 1, ksize=3, borderType=border))
+
+
+class SegmentationPipeline:
+    # этапы сегментации с явными зависимостями; этап считается лениво, только
+    # когда он нужен запрошенному результату, и не больше одного раза
+    def __init__(self, image):
+        self.image = image
+        self.results = {}
+        self.stages = {
+            'float': ((), lambda: np.float32(self.image)),
+            'derivatives': ((), lambda: sobel(self.image)),
+            'edges': (('derivatives',), self.edges),
+            'contours': (('edges',), self.contours),
+            'corners': (('float',), self.corners),
+            'gradient': (('derivatives',), self.gradient),
+        }
+
+    def get(self, name):
+        if name not in self.results:
+            dependencies, stage = self.stages[name]
+            for dependency in dependencies:
+                self.get(dependency)
+            self.results[name] = stage()
+        return self.results[name]
+
+    def edges(self):
+        # Canny сам считает Собеля с BORDER_REPLICATE, а общие производные - с
+        # BORDER_REFLECT_101; они различаются только в крайних строках и столбцах,
+        # поэтому достаточно пересчитать рамку по полоскам шириной 3 пикселя
+        dx, dy = (d.copy() for d in self.get('derivatives'))
+        for strip, index in (((slice(0, 3), slice(None)), (0, slice(None))),
+                             ((slice(-3, None), slice(None)), (-1, slice(None))),
+                             ((slice(None), slice(0, 3)), (slice(None), 0)),
+                             ((slice(None), slice(-3, None)), (slice(None), -1))):
+            strip_dx, strip_dy = sobel(self.image[strip], cv2.BORDER_REPLICATE)
+            dx[index] = strip_dx[index]
+            dy[index] = strip_dy[index]
+        return cv2.Canny(dx, dy, 50, 150)
+
+    def contours(self):
+        contours, _ = cv2.findContours(self.get('edges'), cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+        return contours
+
+    def corners(self):
+        dst = cv2.cornerHarris(self.get('float'), blockSize=2, ksize=3, k=0.04)
+        dst = cv2.dilate(dst, None)
+        return dst > 0.01 * dst.max()
+
+    def gradient(self):
+        grad_x, grad_y = (d.astype(np.float64) for d in self.get('derivatives'))
+        grad = cv2.magnitude(grad_x, grad_y)
+        return cv2.normalize(grad, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+
+    def composite(self, overlays=(), base='gradient'):
+        filtered_image = np.copy(self.get('gradient') if base == 'gradient' else self.image)
+        if 'contours' in overlays:
+            cv2.drawContours(filtered_image, self.get('contours'), -1, 255, 2)
+        if 'corners' in overlays:
+            filtered_image[self.get('corners')] = 255
+        return filtered_image
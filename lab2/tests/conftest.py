@@ -0,0 +1,20 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+# модули лабораторной импортируются по имени, как в её скриптах, а common - из корня репозитория
+LAB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, LAB_DIR)
+sys.path.append(os.path.join(LAB_DIR, '..'))
+
+
+@pytest.fixture(scope='session')
+def image():
+    # плавный фон с тёмными пятнами и шумом, как скан страницы; размеры не
+    # кратны ни окнам, ни тайлам
+    rng = np.random.default_rng(1)
+    y, x = np.mgrid[0:97, 0:131]
+    image = 150 + 60 * np.sin(x / 17) * np.cos(y / 23) + rng.normal(0, 12, (97, 131))
+    image[rng.random((97, 131)) < 0.05] -= 100
+    return np.clip(image, 0, 255).astype(np.uint8)
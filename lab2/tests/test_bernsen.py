@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from numpy.lib.stride_tricks import sliding_window_view
+from filters import ImageFilters, running_min, running_max
+
+# эталоны: исходный цикл Бернсена из ImageFilterApp и перебор окон
+
+
+def reference_bernsen(image, window_size=10):
+    half_window = window_size // 2
+    filtered_image = np.zeros_like(image)
+    float_image = image.astype(np.float32)
+    for i in range(half_window, image.shape[0] - half_window):
+        for j in range(half_window, image.shape[1] - half_window):
+            local_region = float_image[i-half_window:i+half_window+1, j-half_window:j+half_window+1]
+            threshold = (np.min(local_region) + np.max(local_region)) / 2
+            filtered_image[i, j] = 255 if float_image[i, j] > threshold else 0
+    return filtered_image
+
+
+def window_view(image, window):
+    # окна с повтором крайних значений: то же, что обрезанное у края окно
+    return sliding_window_view(np.pad(image, window // 2, mode='edge'), (window, window))
+
+
+@pytest.mark.parametrize('window', [1, 3, 5, 11, 201])
+def test_running_extremes_match_brute_force(image, window):
+    # окно 201 длиннее изображения
+    view = window_view(image, window)
+    np.testing.assert_array_equal(running_min(image, window), view.min(axis=(-2, -1)))
+    np.testing.assert_array_equal(running_max(image, window), view.max(axis=(-2, -1)))
+
+
+@pytest.mark.parametrize('window_size', [3, 10, 15])
+def test_bernsen_matches_original_loop(image, window_size):
+    # исходный цикл не трогает рамку шириной в половину окна
+    half = window_size // 2
+    inner = (slice(half, -half), slice(half, -half))
+    np.testing.assert_array_equal(ImageFilters.bernsen(image, window_size)[inner],
+                                  reference_bernsen(image, window_size)[inner])
+
+
+def test_bernsen_contrast_threshold(image):
+    # в малоконтрастном окне класс - по середине диапазона яркостей
+    window_size, contrast = 6, 40
+    view = window_view(image.astype(int), window_size // 2 * 2 + 1)
+    local_min, local_max = view.min(axis=(-2, -1)), view.max(axis=(-2, -1))
+    expected = np.where(2 * image.astype(int) > local_min + local_max, 255, 0)
+    low = local_max - local_min < contrast
+    expected[low] = np.where(local_min + local_max >= 256, 255, 0)[low]
+    np.testing.assert_array_equal(ImageFilters.bernsen(image, window_size, contrast), expected)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+import skimage
+from numpy.lib.stride_tricks import sliding_window_view
+from local_stats import LocalStatistics
+
+# эталон для Ниблэка и Саволы - skimage.filters, для Вольфа - перебор окон
+
+
+@pytest.mark.parametrize('window', [3, 15, 31])
+@pytest.mark.parametrize('k', [-0.2, 0.2, 0.5])
+def test_niblack_sauvola_match_skimage(image, window, k):
+    stats = LocalStatistics(image)
+    for name, threshold in (('niblack', skimage.filters.threshold_niblack),
+                            ('sauvola', skimage.filters.threshold_sauvola)):
+        expected = threshold(image, window_size=window, k=k)
+        np.testing.assert_allclose(getattr(stats, name)(window, k), expected, rtol=0, atol=1e-9)
+        np.testing.assert_array_equal(stats.binarize(name, window, k),
+                                      np.where(image > expected, 255, 0).astype(np.uint8))
+
+
+def test_wolf_matches_brute_force(image):
+    window, k = 15, 0.5
+    view = sliding_window_view(np.pad(image.astype(np.float64), window // 2, mode='reflect'), (window, window))
+    mean = view.mean(axis=(-2, -1))
+    std = view.std(axis=(-2, -1))
+    expected = (1 - k) * mean + k * image.min() + k * (std / std.max()) * (mean - image.min())
+    np.testing.assert_allclose(LocalStatistics(image).wolf(window, k), expected, rtol=0, atol=1e-9)
+
+
+def test_window_larger_than_integral_padding(image):
+    # окно больше max_window - интегральные изображения перестраиваются
+    stats = LocalStatistics(image, max_window=5)
+    np.testing.assert_array_equal(stats.binarize('sauvola', 41, 0.2),
+                                  LocalStatistics(image).binarize('sauvola', 41, 0.2))
+    with pytest.raises(ValueError):
+        stats.mean_std(4)
+
+
+def test_only_last_window_cached(image):
+    stats = LocalStatistics(image)
+    mean, std = stats.mean_std(15)
+    # смена k не пересчитывает окно, другое окно вытесняет прежнее
+    assert stats.mean_std(15)[0] is mean
+    stats.mean_std(31)
+    assert stats.window == 31
+    assert stats.mean_std(15)[0] is not mean
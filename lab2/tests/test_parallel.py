@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from filters import FILTERS
+from parallel import apply_parallel
+
+
+@pytest.mark.parametrize('filter_name, params', [
+    ('niblack', {'window_size': 21, 'k': 0.3}),
+    ('sauvola', {}),
+    ('bernsen', {'window_size': 7, 'contrast_threshold': 15}),
+    ('gradient', {}),
+])
+@pytest.mark.parametrize('workers, bands', [(1, None), (3, 5), (4, 97)])
+def test_parallel_matches_whole_image(image, filter_name, params, workers, bands):
+    # 97 полос - по одной строке, перекрытие шире полосы
+    np.testing.assert_array_equal(apply_parallel(image, filter_name, workers=workers, bands=bands, **params),
+                                  FILTERS[filter_name](image, **params))
+
+
+def test_parallel_progress_and_cancel(image):
+    calls = []
+    apply_parallel(image, 'niblack', workers=2, bands=4, progress=lambda done, total: calls.append((done, total)))
+    assert calls == [(1, 4), (2, 4), (3, 4), (4, 4)]
+
+    def cancel(done, total):
+        raise KeyboardInterrupt()
+    with pytest.raises(KeyboardInterrupt):
+        apply_parallel(image, 'sauvola', workers=2, bands=8, progress=cancel)
+
+
+def test_shared_executor_stays_open(image):
+    with ThreadPoolExecutor(2) as executor:
+        for filter_name in ('niblack', 'gradient'):
+            np.testing.assert_array_equal(apply_parallel(image, filter_name, workers=2, executor=executor),
+                                          FILTERS[filter_name](image))
+        assert executor.submit(lambda: 1).result() == 1
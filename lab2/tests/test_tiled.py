@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from filters import FILTERS
+from tiled import apply_tiled, read_tile
+
+
+@pytest.mark.parametrize('filter_name, params', [
+    ('niblack', {}),
+    ('niblack', {'window_size': 21, 'k': 0.3}),
+    ('sauvola', {}),
+    ('bernsen', {}),
+    ('bernsen', {'window_size': 7, 'contrast_threshold': 15}),
+    ('gradient', {}),
+])
+@pytest.mark.parametrize('tile_size', [8, 37, 1000])
+def test_tiled_matches_whole_image(image, filter_name, params, tile_size):
+    # тайлы мельче окна: перекрытие должно доставать до соседних тайлов
+    np.testing.assert_array_equal(apply_tiled(image, filter_name, tile_size=tile_size, **params),
+                                  FILTERS[filter_name](image, **params))
+
+
+def test_read_tile_halo_clipped_at_borders():
+    image = np.arange(100).reshape(10, 10)
+    tile, inner = read_tile(image, (0, 4, 6, 10), 3)
+    assert tile.shape == (7, 7)
+    np.testing.assert_array_equal(tile[inner], image[0:4, 6:10])
+
+
+def test_tiled_progress(image):
+    calls = []
+    apply_tiled(image, 'gradient', tile_size=64, progress=lambda done, total: calls.append((done, total)))
+    # 2 x 3 тайла, у градиента два прохода
+    assert calls == [(done, 12) for done in range(1, 13)]
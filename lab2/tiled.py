@@ -0,0 +1,161 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+# общие модули (common) лежат в корне репозитория; путь к нему добавляет
+# запущенный скрипт, модули, которые только импортируются, sys.path не меняют
+if __name__ == '__main__':
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import cv2
+import numpy as np
+from filters import ImageFilters
+from batch import parse_params
+from common.profiling import profiled, pixels
+
+RAW_EXTENSIONS = ('.raw', '.bin')
+
+# фильтр -> (функция, ширина перекрытия тайлов для заданных параметров);
+# перекрытие равно радиусу окна, поэтому результат совпадает с обработкой целиком
+TILED_FILTERS = {
+    'niblack': (ImageFilters.niblack, lambda window_size=15, k=-0.2: window_size // 2),
+    'sauvola': (ImageFilters.sauvola, lambda window_size=15, k=0.2: window_size // 2),
+    'bernsen': (ImageFilters.bernsen, lambda window_size=10, contrast_threshold=0: window_size // 2),
+    'gradient': (ImageFilters.gradient_magnitude, lambda: 1),
+}
+
+
+def tile_boxes(height, width, tile_size):
+    for y0 in range(0, height, tile_size):
+        for x0 in range(0, width, tile_size):
+            yield y0, min(y0 + tile_size, height), x0, min(x0 + tile_size, width)
+
+
+def read_tile(image, box, halo):
+    # тайл вместе с перекрытием, обрезанным по границам изображения,
+    # и срез, возвращающий из результата только сам тайл
+    y0, y1, x0, x1 = box
+    top, left = max(0, y0 - halo), max(0, x0 - halo)
+    bottom, right = min(image.shape[0], y1 + halo), min(image.shape[1], x1 + halo)
+
+    tile = np.ascontiguousarray(image[top:bottom, left:right])
+    inner = (slice(y0 - top, y1 - top), slice(x0 - left, x1 - left))
+    return tile, inner
+
+
+@profiled('apply_tiled', size=pixels)
+def apply_tiled(image, filter_name, out=None, tile_size=1024, progress=None, **params):
+    function, halo = TILED_FILTERS[filter_name]
+    halo = halo(**params)
+    if out is None:
+        out = np.empty(image.shape[:2], dtype=np.uint8)
+
+    boxes = list(tile_boxes(image.shape[0], image.shape[1], tile_size))
+    passes = 2 if filter_name == 'gradient' else 1
+    total = passes * len(boxes)
+
+    if filter_name == 'gradient':
+        # нормировка глобальная: первый проход ищет min/max, второй пересчитывает
+        # модуль градиента по тайлам и нормирует, не храня его для всего изображения
+        grad_min, grad_max = np.inf, -np.inf
+        for done, box in enumerate(boxes, 1):
+            tile, inner = read_tile(image, box, halo)
+            grad = function(tile)[inner]
+            grad_min = min(grad_min, grad.min())
+            grad_max = max(grad_max, grad.max())
+            if progress is not None:
+                progress(done, total)
+
+    for done, box in enumerate(boxes, len(boxes) * (passes - 1) + 1):
+        y0, y1, x0, x1 = box
+        tile, inner = read_tile(image, box, halo)
+        if filter_name == 'gradient':
+            out[y0:y1, x0:x1] = ImageFilters.normalize_gradient(function(tile)[inner], grad_min, grad_max)
+        else:
+            out[y0:y1, x0:x1] = function(tile, **params)[inner]
+        if progress is not None:
+            progress(done, total)
+
+    return out
+
+
+def open_input(path, shape):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.npy':
+        return np.load(path, mmap_mode='r')
+    if extension in RAW_EXTENSIONS:
+        if shape is None:
+            sys.exit('--shape HEIGHT WIDTH is required for raw dumps')
+        return np.memmap(path, dtype=np.uint8, mode='r', shape=tuple(shape))
+
+    # сжатые форматы нельзя читать по частям, такое изображение декодируется целиком
+    image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        sys.exit(f'cannot read image {path}')
+    return image
+
+
+def open_output(path, shape):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.npy':
+        return np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=shape), None
+    if extension in RAW_EXTENSIONS:
+        return np.memmap(path, dtype=np.uint8, mode='w+', shape=shape), None
+
+    # кодировщику нужен весь кадр: собираем результат во временном mmap
+    fd, tmp_path = tempfile.mkstemp(suffix='.raw')
+    os.close(fd)
+    return np.memmap(tmp_path, dtype=np.uint8, mode='w+', shape=shape), tmp_path
+
+
+def peak_rss_mb():
+    # resource есть только на Unix; модуль импортирует и окно lab2 через
+    # worker, поэтому он подключается здесь, а не в начале файла
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS отдаёт байты, Linux - килобайты
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Filter a large grayscale image tile by tile.')
+    parser.add_argument('input', help='.npy, .raw/.bin dump or image file')
+    parser.add_argument('output', help='.npy, .raw/.bin dump or image file')
+    parser.add_argument('--filter', choices=TILED_FILTERS, required=True)
+    parser.add_argument('--param', action='append', default=[], metavar='NAME=VALUE',
+                        help='filter parameter, e.g. window_size=15 (repeatable)')
+    parser.add_argument('--shape', type=int, nargs=2, metavar=('HEIGHT', 'WIDTH'),
+                        help='image size for raw dumps')
+    parser.add_argument('--tile-size', type=int, default=1024)
+    args = parser.parse_args()
+
+    image = open_input(args.input, args.shape)
+    if image.ndim != 2:
+        sys.exit(f'expected a grayscale image, got shape {image.shape}')
+    out, tmp_path = open_output(args.output, image.shape)
+
+    start = time.perf_counter()
+    try:
+        apply_tiled(image, args.filter, out, args.tile_size, **parse_params(args.param))
+        if tmp_path is None:
+            out.flush()
+        else:
+            cv2.imwrite(args.output, np.asarray(out))
+    finally:
+        del out
+        if tmp_path is not None:
+            os.remove(tmp_path)
+    elapsed = time.perf_counter() - start
+
+    megapixels = image.shape[0] * image.shape[1] / 1e6
+    peak = peak_rss_mb()
+    print(f'{args.input} -> {args.output}: {image.shape[1]}x{image.shape[0]} {args.filter}, '
+          f'{elapsed:.2f} s, {megapixels / elapsed:.1f} MP/s'
+          + ('' if peak is None else f', peak RSS {peak:.0f} MB'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+import os
+import sys
+import time
+import queue
+import argparse
+import threading
+# общие модули (common) лежат в корне репозитория; путь к нему добавляет
+# запущенный скрипт, модули, которые только импортируются, sys.path не меняют
+if __name__ == '__main__':
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import cv2
+import numpy as np
+from tiled import TILED_FILTERS
+from concurrent.futures import ThreadPoolExecutor
+from parallel import apply_parallel
+from batch import parse_params
+
+STAGES = ('decode', 'filter', 'encode')
+
+
+class StageStopped(Exception):
+    pass
+
+
+class BufferPool:
+    # кадры одного размера переиспользуются по кругу; пока все буферы заняты,
+    # предыдущая стадия ждёт, так что пул заодно ограничивает число кадров в работе
+    def __init__(self, shape, dtype, count):
+        self.free = queue.Queue()
+        for _ in range(count):
+            self.free.put(np.empty(shape, dtype=dtype))
+
+    def release(self, buffer):
+        self.free.put(buffer)
+
+
+class StageTiming:
+    def __init__(self):
+        self.frames = 0
+        self.busy = 0.0
+        self.waiting = 0.0
+
+    def report(self):
+        return {
+            'frames': self.frames,
+            'busy_seconds': self.busy,
+            'waiting_seconds': self.waiting,
+            'frames_per_second': self.frames / self.busy if self.busy else 0.0,
+        }
+
+
+class VideoPipeline:
+    # декодирование, фильтр и кодирование идут в своих потоках и связаны
+    # очередями ограниченной длины; None в очереди означает конец видео
+    def __init__(self, capture, writer, shape, filter_name, params, queue_size=4, workers=None):
+        self.capture = capture
+        self.writer = writer
+        self.filter_name = filter_name
+        self.params = params
+        self.workers = workers or os.cpu_count()
+
+        self.decoded = queue.Queue(queue_size)
+        self.filtered = queue.Queue(queue_size)
+        # буферов на два больше длины очереди: по одному держат соседние стадии
+        self.frames = BufferPool(shape, np.uint8, queue_size + 2)
+        self.results = BufferPool(shape, np.uint8, queue_size + 2)
+
+        self.timings = {stage: StageTiming() for stage in STAGES}
+        self.stopped = threading.Event()
+        self.error = None
+
+    def wait(self, stage, operation, *args):
+        # блокирующая операция с очередью, прерываемая при ошибке в другой стадии
+        start = time.perf_counter()
+        try:
+            while True:
+                if self.stopped.is_set():
+                    raise StageStopped()
+                try:
+                    return operation(*args, timeout=0.1)
+                except (queue.Empty, queue.Full):
+                    pass
+        finally:
+            self.timings[stage].waiting += time.perf_counter() - start
+
+    def decode(self):
+        timing = self.timings['decode']
+        frame = None
+        while True:
+            gray = self.wait('decode', self.frames.free.get)
+            start = time.perf_counter()
+            ok, frame = self.capture.read(frame)
+            if not ok:
+                self.frames.release(gray)
+                break
+            if frame.ndim == 3:
+                cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=gray)
+            else:
+                gray[...] = frame
+            timing.busy += time.perf_counter() - start
+            timing.frames += 1
+            self.wait('decode', self.decoded.put, gray)
+        self.wait('decode', self.decoded.put, None)
+
+    def filter(self):
+        timing = self.timings['filter']
+        # один пул на всё видео: потоки не создаются заново для каждого кадра
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while True:
+                gray = self.wait('filter', self.decoded.get)
+                if gray is None:
+                    break
+                result = self.wait('filter', self.results.free.get)
+                start = time.perf_counter()
+                apply_parallel(gray, self.filter_name, out=result, workers=self.workers, executor=executor,
+                               **self.params)
+                timing.busy += time.perf_counter() - start
+                timing.frames += 1
+                self.frames.release(gray)
+                self.wait('filter', self.filtered.put, result)
+        self.wait('filter', self.filtered.put, None)
+
+    def encode(self):
+        timing = self.timings['encode']
+        while True:
+            result = self.wait('encode', self.filtered.get)
+            if result is None:
+                break
+            start = time.perf_counter()
+            self.writer.write(result)
+            timing.busy += time.perf_counter() - start
+            timing.frames += 1
+            self.results.release(result)
+
+    def run_stage(self, stage):
+        try:
+            getattr(self, stage)()
+        except StageStopped:
+            pass
+        except Exception as error:
+            self.error = error
+            self.stopped.set()
+
+    def run(self):
+        threads = [threading.Thread(target=self.run_stage, args=(stage,), name=stage) for stage in STAGES]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def report(self):
+        timings = {stage: timing.report() for stage, timing in self.timings.items()}
+        bottleneck = max(STAGES, key=lambda stage: self.timings[stage].busy)
+        return timings, bottleneck
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Binarize a video file frame by frame with a lab2 filter.')
+    parser.add_argument('input', help='video file')
+    parser.add_argument('output', help='video file, written in grayscale')
+    parser.add_argument('--filter', choices=TILED_FILTERS, required=True)
+    parser.add_argument('--param', action='append', default=[], metavar='NAME=VALUE',
+                        help='filter parameter, e.g. window_size=15 (repeatable)')
+    parser.add_argument('--codec', default='mp4v', help='FourCC of the output codec')
+    parser.add_argument('--queue-size', type=int, default=4, help='frames buffered between stages')
+    parser.add_argument('--workers', type=int, default=None, help='threads filtering one frame')
+    args = parser.parse_args()
+
+    capture = cv2.VideoCapture(args.input)
+    if not capture.isOpened():
+        sys.exit(f'cannot open video {args.input}')
+    width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+
+    writer = cv2.VideoWriter(args.output, cv2.VideoWriter_fourcc(*args.codec), fps, (width, height), isColor=False)
+    if not writer.isOpened():
+        sys.exit(f'cannot write video {args.output} with codec {args.codec}')
+
+    pipeline = VideoPipeline(capture, writer, (height, width), args.filter, parse_params(args.param),
+                             args.queue_size, args.workers)
+    start = time.perf_counter()
+    try:
+        pipeline.run()
+    finally:
+        capture.release()
+        writer.release()
+    elapsed = time.perf_counter() - start
+
+    timings, bottleneck = pipeline.report()
+    frames = timings['encode']['frames']
+    print(f'{args.input} -> {args.output}: {frames} frames {width}x{height} {args.filter}, '
+          f'{elapsed:.2f} s, {frames / elapsed:.1f} frames/s')
+    for stage, timing in timings.items():
+        print(f'  {stage}: {timing["busy_seconds"]:.2f} s busy, {timing["waiting_seconds"]:.2f} s waiting, '
+              f'{timing["frames_per_second"]:.1f} frames/s')
+    print(f'bottleneck: {bottleneck}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+from filters import FILTERS
+from tiled import TILED_FILTERS
+from parallel import apply_parallel
+
+
+class FilterCancelled(Exception):
+    pass
+
+
+class FilterWorker(QThread):
+    # номер задания передаётся в каждом сигнале, чтобы окно отбрасывало
+    # результаты заданий, которые уже заменены новыми
+    progress = pyqtSignal(int, int, int)
+    finished_image = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+    def __init__(self, job, image, filter_name, params, parent=None):
+        super().__init__(parent)
+        self.job = job
+        self.image = image
+        self.filter_name = filter_name
+        self.params = params
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def report(self, done, total):
+        # вызывается между тайлами: здесь же проверяется отмена
+        if self.cancelled:
+            raise FilterCancelled()
+        self.progress.emit(self.job, done, total)
+
+    def run(self):
+        try:
+            if self.filter_name in TILED_FILTERS:
+                result = apply_parallel(self.image, self.filter_name, progress=self.report, **self.params)
+            else:
+                self.report(0, 0)
+                result = FILTERS[self.filter_name](self.image, **self.params)
+        except FilterCancelled:
+            return
+        except Exception as error:
+            self.failed.emit(self.job, str(error))
+            return
+
+        if not self.cancelled:
+            self.finished_image.emit(self.job, result)
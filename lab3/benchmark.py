@@ -0,0 +1,133 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+# общие модули (common) лежат в корне репозитория; путь к нему добавляет
+# запущенный скрипт, модули, которые только импортируются, sys.path не меняют
+if __name__ == '__main__':
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import numpy as np
+from modules.raster import LINE_ALGORITHMS, bresenham_circle, rasterize_circles, rasterize_lines
+
+
+def random_segments(count, length, rng):
+    # отрезки заданной длины во всех направлениях
+    angles = rng.uniform(0, 2 * np.pi, count)
+    starts = rng.integers(-1000, 1000, size=(count, 2))
+    ends = starts + np.rint(length * np.c_[np.cos(angles), np.sin(angles)]).astype(np.int64)
+    return np.c_[starts, ends]
+
+
+def axis_segments(count, length, rng):
+    # горизонтальные, вертикальные и диагональные: здесь все алгоритмы
+    # отрезков обязаны давать одни и те же клетки
+    directions = np.array([(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)])
+    starts = rng.integers(-1000, 1000, size=(count, 2))
+    ends = starts + length * directions[rng.integers(0, len(directions), count)]
+    return np.c_[starts, ends]
+
+
+def rate(function, points, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return points / best
+
+
+def run_scalar(function, figures):
+    xs, ys = zip(*(function(*figure) for figure in figures.tolist()))
+    return np.concatenate(xs), np.concatenate(ys)
+
+
+def same(a, b):
+    return bool(np.array_equal(a[0], b[0]) and np.array_equal(a[1], b[1]))
+
+
+def benchmark_lines(name, segments, repeat):
+    scalar, _ = LINE_ALGORITHMS[name]
+    scalar_cells = run_scalar(scalar, segments)
+    batch_cells = rasterize_lines(segments, name)
+    points = scalar_cells[0].size
+
+    # первая и последняя клетки каждого отрезка - его концы
+    counts = np.array([scalar(*segment)[0].size for segment in segments[:1000].tolist()])
+    last = np.cumsum(counts) - 1
+    first = last - counts + 1
+    ends = bool((scalar_cells[0][first] == segments[:1000, 0]).all()
+                and (scalar_cells[1][first] == segments[:1000, 1]).all()
+                and (scalar_cells[0][last] == segments[:1000, 2]).all()
+                and (scalar_cells[1][last] == segments[:1000, 3]).all())
+
+    return {
+        'points': int(points),
+        'scalar_points_per_second': rate(lambda: run_scalar(scalar, segments), points, repeat),
+        'batch_points_per_second': rate(lambda: rasterize_lines(segments, name), points, repeat),
+        'batch_matches_scalar': same(scalar_cells, batch_cells),
+        'ends_match_endpoints': ends,
+    }
+
+
+def benchmark_circles(circles, repeat):
+    scalar_cells = run_scalar(bresenham_circle, circles)
+    points = scalar_cells[0].size
+    return {
+        'points': int(points),
+        'scalar_points_per_second': rate(lambda: run_scalar(bresenham_circle, circles), points, repeat),
+        'batch_points_per_second': rate(lambda: rasterize_circles(circles), points, repeat),
+        'batch_matches_scalar': same(scalar_cells, rasterize_circles(circles)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='lab3 rasterization speed and consistency benchmark.')
+    parser.add_argument('--count', type=int, default=2000, help='figures per length')
+    parser.add_argument('--lengths', type=int, nargs='+', default=[1, 10, 100, 1000],
+                        help='segment lengths and circle radii')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per measurement, best is reported')
+    parser.add_argument('--output', help='write JSON here instead of stdout')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    report = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'lines': {name: {} for name in LINE_ALGORITHMS},
+        'circles': {},
+        'axis_lines_identical': {},
+    }
+
+    for length in args.lengths:
+        # на длинных фигурах точек много: число фигур уменьшается
+        count = max(10, args.count * 100 // max(length, 100))
+        segments = random_segments(count, length, rng)
+        for name in LINE_ALGORITHMS:
+            report['lines'][name][length] = benchmark_lines(name, segments, args.repeat)
+
+        circles = np.c_[rng.integers(-1000, 1000, size=(count, 2)), np.full(count, length)]
+        report['circles'][length] = benchmark_circles(circles, args.repeat)
+
+        axis = axis_segments(count, length, rng)
+        results = [run_scalar(scalar, axis) for scalar, _ in LINE_ALGORITHMS.values()]
+        report['axis_lines_identical'][length] = all(same(results[0], result) for result in results[1:])
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(text + '\n')
+    else:
+        print(text)
+
+    consistent = (all(result['batch_matches_scalar'] and result['ends_match_endpoints']
+                      for results in report['lines'].values() for result in results.values())
+                  and all(result['batch_matches_scalar'] for result in report['circles'].values())
+                  and all(report['axis_lines_identical'].values()))
+    sys.exit(0 if consistent else 1)
+
+
+if __name__ == '__main__':
+    main()
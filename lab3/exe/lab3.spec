@@ -3,7 +3,7 @@
 
 a = Analysis(
     ['lab3.py'],
-    pathex=[],
+    pathex=['..'],
     binaries=[],
     datas=[],
     hiddenimports=[],
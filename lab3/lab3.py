@@ -1,4 +1,10 @@
+import os
 import sys
+import multiprocessing
+# общие модули (common) лежат в корне репозитория; путь к нему добавляет
+# запущенный скрипт, модули, которые только импортируются, sys.path не меняют
+if __name__ == '__main__':
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 from PyQt5.QtWidgets import QApplication
 from modules.mainwindow import MainWindow
 
@@ -10,4 +16,6 @@ def main():
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # процессы пула растеризации в собранном PyInstaller exe
+    multiprocessing.freeze_support()
+    main()
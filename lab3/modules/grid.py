@@ -1,82 +1,374 @@
-from PyQt5.QtWidgets import  QGraphicsItem
-from PyQt5.QtCore import Qt, QRectF, QPoint
-from PyQt5.QtGui import QBrush, QFont
+import math
+import numpy as np
+from PyQt5.QtWidgets import  QGraphicsItem, QStyleOptionGraphicsItem
+from PyQt5.QtCore import Qt, QRectF, QPointF, QLineF
+from PyQt5.QtGui import QBrush, QFont, QFontMetricsF, QImage, QPainter, QPixmap, qRgb
+from common.profiling import profiled
 
 class GridItem(QGraphicsItem):
-    def __init__(self, size, spacing):
+    # клетки хранятся кусками CHUNK_SIZE x CHUNK_SIZE, которые заводятся при
+    # первой закрашенной в них клетке; номера клеток - от -CELL_LIMIT до
+    # CELL_LIMIT - 1 по обеим осям
+    CHUNK_SIZE = 32
+    CELL_LIMIT = 2 ** 22
+
+    # уровни детализации по размеру клетки на экране в пикселях: мельче
+    # GRID_MIN_PIXELS линии сетки не рисуются, мельче CELLS_MIN_PIXELS кусок
+    # рисуется одной картинкой, а если и кусок мельче CHUNK_MIN_PIXELS -
+    # одним прямоугольником
+    GRID_MIN_PIXELS = 4
+    CELLS_MIN_PIXELS = 2
+    CHUNK_MIN_PIXELS = 4
+    LABELS_MIN_DETAIL = 0.5
+
+    # сторона растра с повторяющимся фрагментом сетки
+    TILE_PIXELS = 256
+
+    def __init__(self, spacing):
         super(GridItem, self).__init__()
 
-        self.size = size
         self.spacing = spacing
         self.cell_size = spacing
-        self.cells = []
         self.pixels = []
 
-    def setup_grid(self, painter):
-        pen = painter.pen()
-        pen.setColor(Qt.lightGray)
-        painter.setPen(pen)
+        # (номер куска по x, номер куска по y) -> occupied[y, x] внутри куска
+        self.chunks = {}
+        self.chunk_images = {}
+        self.chunk_keys = None
+
+        # заливки - блоки отрезков строк: {шаг огрубления: (rows, starts, ends)}
+        self.span_blocks = []
+
+        # фрагменты сетки по уровням масштаба
+        self.grid_tiles = {}
+        self.number_font = QFont('Arial', self.spacing // 5)
+        self.number_metrics = QFontMetricsF(self.number_font)
+        self.axis_font = QFont('Arial', 12)
+
+        # без этого флага option.exposedRect - весь boundingRect
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption)
+
+    def boundingRect(self):
+        limit = self.CELL_LIMIT * self.spacing
+        return QRectF(-limit, -limit, 2 * limit, 2 * limit)
+
+    def visible_cells(self, rect):
+        # диапазон номеров клеток, задевающих rect, с обрезкой по границам холста
+        first_x = max(-self.CELL_LIMIT, math.floor(rect.left() / self.spacing))
+        first_y = max(-self.CELL_LIMIT, math.floor(rect.top() / self.spacing))
+        last_x = min(self.CELL_LIMIT - 1, math.floor(rect.right() / self.spacing))
+        last_y = min(self.CELL_LIMIT - 1, math.floor(rect.bottom() / self.spacing))
+        return first_x, first_y, last_x, last_y
 
-        # вертикальные линии сетки
-        for i in range(0, self.size, self.spacing):
-            painter.drawLine(i, 0, i, self.size)
+    def grid_tile(self, level, hints):
+        # сетка периодична: достаточно растра на несколько клеток, которым
+        # замощается видимая область
+        if level not in self.grid_tiles:
+            cells = max(1, int(self.TILE_PIXELS // (self.spacing * level)))
+            side = int(cells * self.spacing * level)
+            pixmap = QPixmap(side, side)
+            pixmap.fill(Qt.transparent)
 
-        # горизонтальные линии сетки
-        for i in range(0, self.size, self.spacing):
-            painter.drawLine(0, i, self.size, i)
+            painter = QPainter(pixmap)
+            painter.setRenderHints(hints)
+            painter.scale(level, level)
+            pen = painter.pen()
+            pen.setColor(Qt.lightGray)
+            painter.setPen(pen)
+            for i in range(cells):
+                painter.drawLine(QLineF(i * self.spacing, 0, i * self.spacing, cells * self.spacing))
+                painter.drawLine(QLineF(0, i * self.spacing, cells * self.spacing, i * self.spacing))
+            painter.end()
+            self.grid_tiles[level] = pixmap
+        return self.grid_tiles[level]
+
+    def setup_grid(self, painter, rect, detail):
+        # масштаб округляется вверх до степени двойки: растр не бывает
+        # мельче экрана, а при плавном зуме перестраивается редко
+        level = 2.0 ** math.ceil(math.log2(detail))
+        tile = self.grid_tile(level, painter.renderHints())
+
+        painter.save()
+        painter.scale(1 / level, 1 / level)
+        target = QRectF(rect.left() * level, rect.top() * level, rect.width() * level, rect.height() * level)
+        offset = QPointF(target.left() % tile.width(), target.top() % tile.height())
+        painter.drawTiledPixmap(target, tile, offset)
+        painter.restore()
+
+    def setup_axes(self, painter, rect, detail):
+        first_x, first_y, last_x, last_y = self.visible_cells(rect)
 
         pen_axis = painter.pen()
         pen_axis.setColor(Qt.black)
+        # толщина осей не зависит от масштаба, иначе издалека их не видно
+        pen_axis.setCosmetic(True)
         painter.setPen(pen_axis)
 
-        # система координат
-        painter.drawLine(0, 0, 0, self.size)
-        painter.drawLine(0, 0, self.size, 0)
-        number_size = self.spacing // 5
-        painter.setFont(QFont('Arial', number_size))
+        # система координат - только видимые части осей
+        if rect.left() <= 0 <= rect.right():
+            painter.drawLine(QLineF(0, rect.top(), 0, rect.bottom()))
+        if rect.top() <= 0 <= rect.bottom():
+            painter.drawLine(QLineF(rect.left(), 0, rect.right(), 0))
 
-        x_delta = self.spacing // 4
-        y_delta = self.spacing // 2
+        if detail >= self.LABELS_MIN_DETAIL:
+            painter.setFont(self.number_font)
+            x_delta = self.spacing // 4
+            y_delta = self.spacing // 2
 
-        # числовые метки по оси х
-        for i in range(0, self.size, self.spacing):
-            temp = i // self.spacing
-            painter.drawText(QPoint(i + x_delta, y_delta), str(temp))
-            painter.drawLine(0, i, 3, i)
+            # подписываются клетки с шагом 1, 10, 100...: длинное число не влезает в клетку
+            widest = max(abs(first_x), abs(last_x), abs(first_y), abs(last_y))
+            step = 1
+            while self.number_metrics.width(str(-widest)) + x_delta > step * self.spacing:
+                step *= 10
 
-        # числовые метки по оси у
-        for i in range(0, self.size, self.spacing):
-            temp = i // self.spacing
-            if (temp > 0):
-                painter.drawText(QPoint(x_delta, i + 2 + y_delta), str(temp))
-            painter.drawLine(i, 0, i, 3)
+            # числовые метки по оси х
+            if first_y <= 0 <= last_y:
+                for temp in range(first_x + (-first_x) % step, last_x + 1, step):
+                    i = temp * self.spacing
+                    painter.drawText(QPointF(i + x_delta, y_delta), str(temp))
+                    painter.drawLine(QLineF(i, 0, i, 3))
 
-        painter.setFont(QFont('Arial', 12))
-        painter.drawText(QPoint(self.size, 30), 'x')
-        painter.drawText(QPoint(-30, self.size), 'y')
+            # числовые метки по оси у
+            if first_x <= 0 <= last_x:
+                for temp in range(first_y + (-first_y) % step, last_y + 1, step):
+                    i = temp * self.spacing
+                    if temp != 0:
+                        painter.drawText(QPointF(x_delta, i + 2 + y_delta), str(temp))
+                    painter.drawLine(QLineF(0, i, 3, i))
 
-    def boundingRect(self):
-        return QRectF(0, 0, self.size, self.size)
+        # подписи осей - у края видимой части
+        painter.setFont(self.axis_font)
+        scale = 1 / detail
+        if rect.top() <= 0 <= rect.bottom():
+            painter.save()
+            painter.translate(rect.right() - 20 * scale, 0)
+            painter.scale(scale, scale)
+            painter.drawText(QPointF(0, 30), 'x')
+            painter.restore()
+        if rect.left() <= 0 <= rect.right():
+            painter.save()
+            painter.translate(0, rect.bottom() - 10 * scale)
+            painter.scale(scale, scale)
+            painter.drawText(QPointF(-30, 0), 'y')
+            painter.restore()
+
+    def cell_spans(self, occupied, col0, row0):
+        # закрашенные клетки куска, слитые в горизонтальные отрезки строк, а
+        # одинаковые отрезки соседних строк - в один прямоугольник
+        padded = np.zeros((occupied.shape[0], occupied.shape[1] + 2), dtype=np.int8)
+        padded[:, 1:-1] = occupied
+        change = np.diff(padded, axis=1)
+        span_rows, starts = np.nonzero(change == 1)
+        _, ends = np.nonzero(change == -1)
+        # видимая часть куска может оказаться пустой
+        if starts.size == 0:
+            return []
+
+        order = np.lexsort((span_rows, ends, starts))
+        span_rows, starts, ends = span_rows[order], starts[order], ends[order]
+        first = np.r_[True, (starts[1:] != starts[:-1]) | (ends[1:] != ends[:-1])
+                      | (span_rows[1:] != span_rows[:-1] + 1)]
+        heights = np.diff(np.r_[np.flatnonzero(first), first.size])
+
+        return [QRectF((col0 + start) * self.spacing, (row0 + row) * self.spacing,
+                       (end - start) * self.spacing, height * self.spacing)
+                for row, start, end, height in zip(span_rows[first].tolist(), starts[first].tolist(),
+                                                   ends[first].tolist(), heights.tolist())]
+
+    def chunk_image(self, key):
+        if key not in self.chunk_images:
+            occupied = np.ascontiguousarray(self.chunks[key], dtype=np.uint8)
+            image = QImage(occupied.data, self.CHUNK_SIZE, self.CHUNK_SIZE, self.CHUNK_SIZE,
+                           QImage.Format_Indexed8)
+            image.setColorTable([0, qRgb(128, 128, 128)])
+            self.chunk_images[key] = image.copy()
+        return self.chunk_images[key]
+
+    def visible_chunks(self, rect):
+        first_x, first_y, last_x, last_y = self.visible_cells(rect)
+        first_x, first_y = first_x // self.CHUNK_SIZE, first_y // self.CHUNK_SIZE
+        last_x, last_y = last_x // self.CHUNK_SIZE, last_y // self.CHUNK_SIZE
 
-    # сетка + закрашивание клеток
+        # перебирается меньшее из двух: видимые номера кусков или заведённые куски
+        if (last_x - first_x + 1) * (last_y - first_y + 1) < len(self.chunks):
+            return [(x, y) for y in range(first_y, last_y + 1) for x in range(first_x, last_x + 1)
+                    if (x, y) in self.chunks]
+        return [(x, y) for x, y in self.chunks if first_x <= x <= last_x and first_y <= y <= last_y]
+
+    def paint_cells(self, painter, rect, detail):
+        cell_pixels = self.spacing * detail
+        chunk_side = self.CHUNK_SIZE * self.spacing
+        painter.save()
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QBrush(Qt.gray, Qt.SolidPattern))
+
+        if cell_pixels * self.CHUNK_SIZE < self.CHUNK_MIN_PIXELS:
+            # издалека виден только сам факт, что в куске что-то закрашено:
+            # куски отмечаются точками в картинке размером с область вывода
+            self.paint_overview(painter, chunk_side)
+        elif cell_pixels < self.CELLS_MIN_PIXELS:
+            for x, y in self.visible_chunks(rect):
+                painter.drawImage(QRectF(x * chunk_side, y * chunk_side, chunk_side, chunk_side),
+                                  self.chunk_image((x, y)))
+        else:
+            # контуры клеток дают линии сетки, поэтому соседние клетки строки
+            # рисуются одним прямоугольником без обводки
+            first_x, first_y, last_x, last_y = self.visible_cells(rect)
+            spans = []
+            for x, y in self.visible_chunks(rect):
+                col0 = max(first_x - x * self.CHUNK_SIZE, 0)
+                row0 = max(first_y - y * self.CHUNK_SIZE, 0)
+                col1 = min(last_x - x * self.CHUNK_SIZE + 1, self.CHUNK_SIZE)
+                row1 = min(last_y - y * self.CHUNK_SIZE + 1, self.CHUNK_SIZE)
+                spans += self.cell_spans(self.chunks[x, y][row0:row1, col0:col1],
+                                         x * self.CHUNK_SIZE + col0, y * self.CHUNK_SIZE + row0)
+            if spans:
+                painter.drawRects(spans)
+        painter.restore()
+
+    def paint_spans(self, painter, rect, detail):
+        # у каждого блока берутся только строки видимой области, отрезки
+        # обрезаются по её краям
+        cell_pixels = self.spacing * detail
+        step = 1 if cell_pixels >= 1 else 2 ** math.ceil(math.log2(1 / cell_pixels))
+        first_x, first_y, last_x, last_y = (value // step for value in self.visible_cells(rect))
+        side = step * self.spacing
+
+        spans = []
+        for block in self.span_blocks:
+            rows, starts, ends = self.span_level(block, step)
+            begin, end = np.searchsorted(rows, [first_y, last_y + 1])
+            rows, starts, ends = rows[begin:end], starts[begin:end], ends[begin:end]
+            inside = (ends >= first_x) & (starts <= last_x)
+            starts = np.maximum(starts[inside], first_x)
+            ends = np.minimum(ends[inside], last_x)
+            spans += [QRectF(start * side, row * side, (end - start + 1) * side, side)
+                      for row, start, end in zip(rows[inside].tolist(), starts.tolist(), ends.tolist())]
+        if spans:
+            painter.save()
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QBrush(Qt.gray, Qt.SolidPattern))
+            painter.drawRects(spans)
+            painter.restore()
+
+    def paint_overview(self, painter, chunk_side):
+        if self.chunk_keys is None:
+            self.chunk_keys = np.array(list(self.chunks), dtype=np.float64).reshape(-1, 2)
+
+        transform = painter.worldTransform()
+        device = painter.viewport()
+        xs = np.floor(self.chunk_keys[:, 0] * chunk_side * transform.m11() + transform.dx()).astype(np.int64)
+        ys = np.floor(self.chunk_keys[:, 1] * chunk_side * transform.m22() + transform.dy()).astype(np.int64)
+        inside = (xs >= 0) & (xs < device.width()) & (ys >= 0) & (ys < device.height())
+
+        # ширина строки QImage кратна четырём байтам
+        stride = (device.width() + 3) // 4 * 4
+        overview = np.zeros((device.height(), stride), dtype=np.uint8)
+        overview[ys[inside], xs[inside]] = 1
+        image = QImage(overview.data, device.width(), device.height(), stride, QImage.Format_Indexed8)
+        image.setColorTable([0, qRgb(128, 128, 128)])
+
+        painter.resetTransform()
+        painter.drawImage(0, 0, image)
+
+    # закрашивание клеток + сетка поверх них
+    @profiled('GridItem.paint', category='paint')
     def paint(self, painter, option, widget):
-        self.setup_grid(painter)
+        # при выводе через QGraphicsView.render exposedRect - весь холст,
+        # поэтому он дополнительно обрезается по области вывода
+        device = painter.worldTransform().inverted()[0].mapRect(QRectF(painter.viewport()))
+        exposed = option.exposedRect.intersected(device)
+        detail = QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
 
-        pen = painter.pen()
-        pen.setColor(Qt.lightGray)
-        painter.setPen(pen)
+        self.paint_cells(painter, exposed, detail)
+        self.paint_spans(painter, exposed, detail)
+        if self.spacing * detail >= self.GRID_MIN_PIXELS:
+            self.setup_grid(painter, exposed, detail)
+        self.setup_axes(painter, exposed, detail)
 
-        brush = QBrush(Qt.gray, Qt.SolidPattern)
-        painter.setBrush(brush)
+    @profiled('GridItem.add_cells', size=lambda result, self, xs, ys: len(xs))
+    def add_cells(self, xs, ys):
+        # клетки по номерам в сетке; выходящие за холст отбрасываются
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        inside = (xs >= -self.CELL_LIMIT) & (xs < self.CELL_LIMIT) & (ys >= -self.CELL_LIMIT) & (ys < self.CELL_LIMIT)
+        xs, ys = xs[inside], ys[inside]
+        if xs.size == 0:
+            return
 
-        for cell in self.cells:
-            painter.drawRect(cell)
+        # клетки раскладываются по кускам одной сортировкой: номер куска
+        # упаковывается в одно целое, сортировка пар по строкам заметно медленнее
+        chunk_x, chunk_y = xs // self.CHUNK_SIZE, ys // self.CHUNK_SIZE
+        chunks = self.CELL_LIMIT // self.CHUNK_SIZE
+        packed = (chunk_x + chunks) * (2 * chunks) + (chunk_y + chunks)
+        order = np.argsort(packed)
+        packed = packed[order]
+        bounds = np.flatnonzero(np.r_[True, packed[1:] != packed[:-1], True])
+        chunk_keys = np.stack([chunk_x[order[bounds[:-1]]], chunk_y[order[bounds[:-1]]]], axis=1)
 
-    def add_cell(self, x, y):
-        cell_rect = QRectF(x, y, self.cell_size, self.cell_size)
-        self.cells.append(cell_rect)
+        for index, (x, y) in enumerate(chunk_keys.tolist()):
+            points = order[bounds[index]:bounds[index + 1]]
+            if (x, y) not in self.chunks:
+                self.chunks[x, y] = np.zeros((self.CHUNK_SIZE, self.CHUNK_SIZE), dtype=bool)
+                self.chunk_keys = None
+            self.chunks[x, y][ys[points] - y * self.CHUNK_SIZE, xs[points] - x * self.CHUNK_SIZE] = True
+            self.chunk_images.pop((x, y), None)
         self.update()
 
+    @profiled('GridItem.add_spans',
+              size=lambda result, self, rows, starts, ends: (np.asarray(ends) - np.asarray(starts) + 1).sum())
+    def add_spans(self, rows, starts, ends):
+        # отрезки строк от starts до ends включительно хранятся отрезками, а
+        # не клетками: память и время растут с числом строк, а не с площадью
+        rows = np.asarray(rows, dtype=np.int64)
+        starts = np.maximum(np.asarray(starts, dtype=np.int64), -self.CELL_LIMIT)
+        ends = np.minimum(np.asarray(ends, dtype=np.int64), self.CELL_LIMIT - 1)
+        inside = (rows >= -self.CELL_LIMIT) & (rows < self.CELL_LIMIT) & (starts <= ends)
+        rows, starts, ends = rows[inside], starts[inside], ends[inside]
+        if rows.size == 0:
+            return
+
+        # блок сливается с предыдущим, пока тот не больше чем вдвое длиннее:
+        # блоков остаётся порядка логарифма от числа отрезков
+        block = self.merge_spans(rows, starts, ends)
+        while self.span_blocks and len(self.span_blocks[-1][1][0]) <= 2 * len(block[0]):
+            previous = self.span_blocks.pop()[1]
+            block = self.merge_spans(*(np.r_[old, new] for old, new in zip(previous, block)))
+        self.span_blocks.append({1: block})
+        self.update()
+
+    def merge_spans(self, rows, starts, ends):
+        # перекрывающиеся и соседние отрезки одной строки сливаются в один,
+        # результат упорядочен по строке и началу; номера клеток влезают в int32
+        rows, starts, ends = (np.asarray(values, dtype=np.int64) for values in (rows, starts, ends))
+        ordered = np.all((rows[1:] > rows[:-1]) | ((rows[1:] == rows[:-1]) & (starts[1:] > ends[:-1] + 1)))
+        if not ordered:
+            # устойчивая сортировка - слиянием готовых участков, поэтому два
+            # уже упорядоченных блока сливаются за линейное время
+            order = np.argsort(rows * (4 * self.CELL_LIMIT) + starts, kind='stable')
+            rows, starts, ends = rows[order], starts[order], ends[order]
+            # накопленный максимум концов не переходит в следующую строку:
+            # сдвиг по номеру строки больше любой разницы концов
+            shift = (rows - rows[0]) * (4 * self.CELL_LIMIT)
+            reach = np.maximum.accumulate(ends + shift) - shift
+            first = np.flatnonzero(np.r_[True, (rows[1:] != rows[:-1]) | (starts[1:] > reach[:-1] + 1)])
+            rows, starts, ends = rows[first], starts[first], np.maximum.reduceat(ends, first)
+        return rows.astype(np.int32), starts.astype(np.int32), ends.astype(np.int32)
+
+    def span_level(self, block, step):
+        # отрезки блока на клетках step x step: мельче пикселя клетки
+        # огрубляются, и отрезков в видимой области не больше, чем пикселей
+        if step not in block:
+            rows, starts, ends = block[1]
+            block[step] = self.merge_spans(rows // step, starts // step, ends // step)
+        return block[step]
+
+    def add_cell(self, x, y):
+        self.add_cells([x // self.cell_size], [y // self.cell_size])
+
     def clear_cells(self):
-        self.cells = []
-        self.update()
\ No newline at end of file
+        self.chunks = {}
+        self.chunk_images = {}
+        self.chunk_keys = None
+        self.span_blocks = []
+        self.update()
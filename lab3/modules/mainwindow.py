@@ -1,18 +1,68 @@
 from PyQt5.QtWidgets import (QMainWindow, QGraphicsLineItem, QLineEdit, QWidget,
                             QLabel, QComboBox, QGridLayout, QToolTip,
-                            QGraphicsScene, QGraphicsView, QPushButton)
-from PyQt5.QtCore import Qt
+                            QGraphicsScene, QGraphicsView, QPushButton,
+                            QFileDialog, QMessageBox)
+from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QPainter, QPen
 from modules.grid import GridItem
+from modules.reference import ReferenceItem
+from modules.scene_io import load_primitives, rasterize_group, draw_figure, split_tasks
+from common.profiling import profiled
+from common.overlay import attach_overlay
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+import multiprocessing
+import numpy as np
 import time
 import math
+import re
 
 class MainWindow(QMainWindow):
+    # алгоритмы отрезков в порядке пунктов выпадающего списка
+    LINE_ALGORITHMS = ('step', 'dda', 'bresenham')
+
+    # пункты списка с заливкой по строкам
+    POLYGON_STATE = 4
+    DISK_STATE = 5
+    FILLS = ('polygon', 'disk')
+
+    # пределы масштаба: при большем приближении координаты края холста
+    # не помещаются в диапазон полос прокрутки
+    MIN_SCALE = 2 ** -14
+    MAX_SCALE = 16
+
+    # загруженные из файла клетки заносятся в сетку порциями по BATCH_CELLS,
+    # пока за один тик таймера не пройдёт FRAME_TIME секунд
+    IMPORT_INTERVAL = 16
+    FRAME_TIME = 0.008
+    BATCH_CELLS = 20000
+
+    # отрезки и окружности длиннее POOL_CELLS клеток растеризуются и
+    # замеряются в пуле и заносятся в сетку так же по частям: пошаговый
+    # алгоритм тратит около половины микросекунды на клетку, и прогрев с
+    # повторами дольше уже не укладывается в кадр. Заливки - если столько
+    # же стоит их расчёт (число строк на число рёбер)
+    POOL_CELLS = 20000
+    # пул окно не задерживает, и там на замер отводится больше времени, чтобы
+    # после прогрева успеть повторить хотя бы один запуск
+    POOL_MEASURE_TIME = 0.5
+
     def __init__(self):
         super().__init__()
         self.state = 0
         self.lines = [] 
 
+        # растеризация загруженных фигур идёт в пуле процессов, он
+        # создаётся при первой загрузке
+        self.pool = None
+        self.import_futures = []
+        self.figure_futures = {}
+        self.figure_time = None
+        self.import_cells = deque()
+        self.import_timer = QTimer(self)
+        self.import_timer.setInterval(self.IMPORT_INTERVAL)
+        self.import_timer.timeout.connect(self.import_step)
+
         central_widget = QWidget(self)
         self.setCentralWidget(central_widget)
         self.layout = QGridLayout()
@@ -24,23 +74,29 @@ class MainWindow(QMainWindow):
 
         central_widget.setLayout(self.layout)
 
-        self.max_coord = (self.grid_size // self.grid_spacing) - 1
+        # координаты ограничены только размером холста
+        self.min_coord = -GridItem.CELL_LIMIT
+        self.max_coord = GridItem.CELL_LIMIT - 1
+
+        # время отрисовки и растеризации поверх окна, если включено CG_PROFILE_OVERLAY
+        self.profile_overlay = attach_overlay(self)
 
     def setup_canvas(self):
         self.scene = QGraphicsScene(self)
         self.view = QGraphicsView(self.scene)
 
-        self.grid_size = 2500
         self.grid_spacing = 25
 
-        self.grid_item = GridItem(self.grid_size, self.grid_spacing)
+        self.grid_item = GridItem(self.grid_spacing)
         self.scene.addItem(self.grid_item)
+        self.scene.setSceneRect(self.grid_item.boundingRect())
 
         self.view.setRenderHint(QPainter.Antialiasing)
         self.view.setMouseTracking(True)
         self.view.viewport().setMouseTracking(True)
         self.view.setRenderHint(QPainter.Antialiasing, True)
         self.view.scale(1, 1)
+        self.view.centerOn(0, 0)
 
         self.set_view_events()
         self.layout.addWidget(self.view, 0, 0, 1, 6)
@@ -57,6 +113,8 @@ class MainWindow(QMainWindow):
             factor = 1.1
             if event.angleDelta().y() < 0:
                 factor = 1.0 / factor
+            scale = self.view.transform().m11()
+            factor = max(self.MIN_SCALE, min(scale * factor, self.MAX_SCALE)) / scale
             self.view.scale(factor, factor)
 
         self.view.mouseMoveEvent = mouseMoveEvent
@@ -74,7 +132,8 @@ class MainWindow(QMainWindow):
         self.y1_edit = QLineEdit()
 
         self.draw_button = QPushButton('Draw')
-        self.draw_button.clicked.connect(self.draw_button_toggled)
+        # clicked передаёт checked, а обёртка замера приняла бы его как аргумент
+        self.draw_button.clicked.connect(lambda: self.draw_button_toggled())
 
         self.layout.addWidget(x0_label, 1, 1)
         self.layout.addWidget(y0_label, 2, 1)
@@ -90,10 +149,13 @@ class MainWindow(QMainWindow):
         self.clear_button = QPushButton('Clear')
         self.clear_button.clicked.connect(self.clear_scene)
         self.layout.addWidget(self.clear_button, 2, 5, 1, 1)
+        self.import_button = QPushButton('Import')
+        self.import_button.clicked.connect(self.import_button_clicked)
+        self.layout.addWidget(self.import_button, 3, 5, 1, 1)
     
     def setup_time_label(self):
         self.time_label = QLabel('Time: ')
-        self.layout.addWidget(self.time_label, 3, 0)
+        self.layout.addWidget(self.time_label, 3, 0, 1, 5)
 
     def setup_algorithm_dropdown(self):
         self.algorithm_combo = QComboBox()
@@ -101,12 +163,21 @@ class MainWindow(QMainWindow):
             'Пошаговый алгоритм',
             'Алгоритм ЦДА',
             'Алгоритм Брезенхема',
-            'Алгоритм Брезенхема (окружность)'
+            'Алгоритм Брезенхема (окружность)',
+            'Построчная заливка многоугольника',
+            'Построчная заливка круга'
         ])
         self.algorithm_combo.currentIndexChanged.connect(self.set_algorithm_state)
         self.layout.addWidget(self.algorithm_combo, 1, 0)
 
+        # вершины многоугольника вводятся одной строкой
+        self.vertices_edit = QLineEdit()
+        self.vertices_edit.setPlaceholderText('Polygon vertices: x y; x y; x y ...')
+        self.vertices_edit.setEnabled(False)
+        self.layout.addWidget(self.vertices_edit, 2, 0)
+
     def clear_scene(self):
+        self.cancel_import()
         for line in self.lines:
             self.scene.removeItem(line)
         self.lines.clear()
@@ -121,16 +192,21 @@ class MainWindow(QMainWindow):
         self.scene.addItem(line_item)
         self.lines.append(line_item)
 
+    @profiled('MainWindow.draw_button_toggled')
     def draw_button_toggled(self):
+        if self.state == self.POLYGON_STATE:
+            self.fill_polygon()
+            return
+
         x0 = int(self.x0_edit.text())
         y0 = int(self.y0_edit.text())
         x1 = int(self.x1_edit.text())
         y1 = int(self.y1_edit.text())
 
-        x0 = max(0, min(x0, self.max_coord))
-        y0 = max(0, min(y0, self.max_coord))
-        x1 = max(0, min(x1, self.max_coord))
-        y1 = max(0, min(y1, self.max_coord))
+        x0 = max(self.min_coord, min(x0, self.max_coord))
+        y0 = max(self.min_coord, min(y0, self.max_coord))
+        x1 = max(self.min_coord, min(x1, self.max_coord))
+        y1 = max(self.min_coord, min(y1, self.max_coord))
 
         self.x0_edit.setText(str(x0))
         self.y0_edit.setText(str(y0))
@@ -139,85 +215,194 @@ class MainWindow(QMainWindow):
 
         self.draw_line(x0, y0, x1, y1)
         
-        start_time = time.perf_counter()
-        if self.state == 0:
-            self.step_algorithm(x0, y0, x1, y1)
-        elif self.state == 1:
-            self.dda_algorithm(x0, y0, x1, y1)
-        elif self.state == 2:
-            self.brezenhem_algorithm(x0, y0, x1, y1)
+        # время алгоритма - прогрев и повторы без Qt, время обновления
+        # сетки (занесение клеток и перерисовка) - отдельно
+        radius = int(math.sqrt((x1 - x0) ** 2 + (y1 - y0) ** 2))
+        if self.state == self.DISK_STATE:
+            name, figure, points = 'disk', (x0, y0, radius), 6 * radius + 8
         elif self.state == 3:
-            radius = int(math.sqrt((x1 - x0) ** 2 + (y1 - y0) ** 2))
-            self.brezenhem_circle(x0, y0, radius)
-        end_time = time.perf_counter()
-
-        delta_time = (end_time - start_time) * 1e6
-        self.time_label.setText('Time: ' + str(round(delta_time, 2)) + ' microseconds')
-
-    def step_algorithm(self, x0, y0, x1, y1):
-        if x1 == x0:  
-            step_y = 1 if y1 > y0 else -1
-            y = y0
-            for _ in range(abs(y1 - y0) + 1):
-                self.brush_cell(x0, y)
-                y += step_y
+            # в октанте около r / sqrt(2) точек, всего их в восемь раз больше
+            name, figure, points = 'circle', (x0, y0, radius), 6 * radius + 8
         else:
-            k = (y1 - y0) / (x1 - x0)  
-            b = y0 - k * x0
-
-            steps = max(abs(x1 - x0), abs(y1 - y0))
-            step_x = (x1 - x0) / steps
-            step_y = (y1 - y0) / steps
-            
-            x = x0
-            for _ in range(steps + 1):
-                y = round(k * x + b)
-                self.brush_cell(x, y)
-                x += step_x
-
-    def dda_algorithm(self, x0, y0, x1, y1):
-        steps = max(abs(x1 - x0), abs(y1 - y0))
-        dx, dy = (x1 - x0) / steps, (y1 - y0) / steps
-        x, y = x0, y0
-        for _ in range(steps + 1):
-            self.brush_cell(round(x), round(y))
-            x += dx
-            y += dy
-
-    def brezenhem_algorithm(self, x0, y0, x1, y1):
-        dx, dy = abs(x1 - x0), abs(y1 - y0)
-        lx = 1 if x0 < x1 else -1
-        ly = 1 if y0 < y1 else -1
-        error = dx - dy
-
-        while True:
-            self.brush_cell(x0, y0)
-            if x0 == x1 and y0 == y1:
-                break
-            e2 = error * 2
-            if e2 > -dy:
-                error -= dy
-                x0 += lx
-            if e2 < dx:
-                error += dx
-                y0 += ly
-
-    def brezenhem_circle(self, xc, yc, r):
-        def plot_circle_points(xc, yc, x, y):
-            for dx, dy in [(x, y), (-x, y), (x, -y), (-x, -y), (y, x), (-y, x), (y, -x), (-y, -x)]:
-                self.brush_cell(xc + dx, yc + dy)
-
-        x, y = 0, r
-        d = 3 - 2 * r
-        while y >= x:
-            plot_circle_points(xc, yc, x, y)
-            x += 1  
-            if d > 0:
-                y -= 1
-                d += 4 * (x - y) + 10
+            name, figure = self.LINE_ALGORITHMS[self.state], (x0, y0, x1, y1)
+            points = max(abs(x1 - x0), abs(y1 - y0)) + 1
+        self.show_figure(name, figure, points)
+
+    def fill_polygon(self):
+        numbers = [int(number) for number in re.findall(r'-?\d+', self.vertices_edit.text())]
+        if len(numbers) < 6 or len(numbers) % 2:
+            QMessageBox.warning(self, 'Polygon', 'Enter at least three vertices as x y pairs, e.g. 0 0; 10 0; 5 8')
+            return
+        vertices = [(max(self.min_coord, min(x, self.max_coord)), max(self.min_coord, min(y, self.max_coord)))
+                    for x, y in zip(numbers[0::2], numbers[1::2])]
+        self.vertices_edit.setText('; '.join(f'{x} {y}' for x, y in vertices))
+
+        for (x0, y0), (x1, y1) in zip(vertices, vertices[1:] + vertices[:1]):
+            self.draw_line(x0, y0, x1, y1)
+        ys = [y for _, y in vertices]
+        self.show_figure('polygon', vertices, (max(ys) - min(ys) + 1) * len(vertices))
+
+    def show_figure(self, name, figure, points):
+        if points > self.POOL_CELLS:
+            self.submit_figure(name, figure)
+            return
+        result, algorithm_time, runs = draw_figure(name, figure)
+
+        # заливка заносится в сетку отрезками строк, а не отдельными клетками
+        start_time = time.perf_counter()
+        if name in self.FILLS:
+            rows, starts, ends = result
+            self.grid_item.add_spans(rows, starts, ends)
+            size = f'{len(rows)} spans, {int((ends - starts + 1).sum())} cells'
+        else:
+            xs, ys = result
+            self.grid_item.add_cells(xs, ys)
+            size = f'{len(xs)} points'
+        self.view.viewport().repaint()
+        update_time = time.perf_counter() - start_time
+
+        self.time_label.setText(f'Time: algorithm {algorithm_time * 1e6:.2f} microseconds '
+                                f'({self.runs_text(runs)}, {size}), '
+                                f'grid update {update_time * 1e6:.2f} microseconds')
+
+    @staticmethod
+    def runs_text(runs):
+        # без повторов время - первый, холодный запуск
+        if runs == 0:
+            return 'single cold run'
+        return 'one run after warm-up' if runs == 1 else f'median of {runs} runs'
+
+    def import_button_clicked(self):
+        path, _ = QFileDialog.getOpenFileName(self, 'Import primitives', '',
+                                              'Primitive lists (*.csv *.json);;All files (*)')
+        if path:
+            self.import_primitives(path)
+
+    def import_primitives(self, path):
+        try:
+            primitives = load_primitives(path)
+        except (OSError, ValueError) as error:
+            QMessageBox.warning(self, 'Import', str(error))
+            return
+
+        self.cancel_import()
+        # координаты, как и введённые вручную, ограничены холстом
+        for name, figures in primitives.items():
+            coords = figures[:, :2] if name == 'circle' else figures
+            coords.clip(self.min_coord, self.max_coord, out=coords)
+        self.draw_reference(primitives)
+
+        self.submit_tasks(split_tasks(primitives))
+
+    def start_pool(self):
+        # задачи добавляются к ещё не законченным, отсчёт времени и
+        # счётчики начинаются заново, только если очередь пуста
+        if self.pool is None:
+            # spawn на всех системах: fork процесса с запущенным Qt ненадёжен
+            self.pool = ProcessPoolExecutor(mp_context=multiprocessing.get_context('spawn'))
+        if not self.import_futures and not self.import_cells:
+            self.import_total = 0
+            self.import_done = 0
+            self.import_points = 0
+            self.import_start = time.perf_counter()
+            self.figure_time = None
+        self.import_timer.start()
+
+    def submit_tasks(self, tasks):
+        # задачи (алгоритм, фигуры): фигуры из файла или один длинный отрезок
+        # или окружность
+        self.start_pool()
+        self.import_futures += [self.pool.submit(rasterize_group, name, figures) for name, figures in tasks]
+        self.import_total += sum(len(figures) for _, figures in tasks)
+
+    def submit_figure(self, name, figure):
+        # фигура из окна вместе с замером времени алгоритма; заливка приходит
+        # отрезками строк и заносится в сетку целиком
+        self.start_pool()
+        future = self.pool.submit(draw_figure, name, figure, self.POOL_MEASURE_TIME)
+        self.import_futures.append(future)
+        self.figure_futures[future] = name
+        self.import_total += 1
+
+    def draw_reference(self, primitives):
+        # все отрезки и окружности файла - один элемент сцены, центры клеток
+        # переводятся в координаты сцены сразу для всех фигур
+        segments = np.concatenate([figures for name, figures in primitives.items() if name != 'circle'])
+        circles = primitives['circle']
+        center = self.grid_spacing // 2
+        reference_item = ReferenceItem(segments * self.grid_spacing + center,
+                                       np.c_[circles[:, :2] * self.grid_spacing + center,
+                                             circles[:, 2] * self.grid_spacing])
+        self.scene.addItem(reference_item)
+        self.lines.append(reference_item)
+
+    @profiled('MainWindow.import_step')
+    def import_step(self):
+        # готовые задачи пула забираются без ожидания, их клетки заносятся
+        # в сетку, пока не кончится время кадра
+        start_time = time.perf_counter()
+        for future in [future for future in self.import_futures if future.done()]:
+            self.import_futures.remove(future)
+            try:
+                result = future.result()
+            except Exception as error:
+                self.cancel_import()
+                # сломанный пул при следующей загрузке создаётся заново
+                self.pool.shutdown(wait=False, cancel_futures=True)
+                self.pool = None
+                QMessageBox.warning(self, 'Rasterization', f'Rasterization failed: {error}')
+                return
+            name = self.figure_futures.pop(future, None)
+            if name is not None:
+                result, algorithm_time, runs = result
+                self.figure_time = (algorithm_time, runs)
+            if name in self.FILLS:
+                rows, starts, ends = result
+                self.grid_item.add_spans(rows, starts, ends)
+                self.import_points += int((ends - starts + 1).sum())
             else:
-                d += 4 * x + 6
-     
+                self.import_cells.append(result)
+            self.import_done += 1
+
+        while self.import_cells and time.perf_counter() - start_time < self.FRAME_TIME:
+            xs, ys = self.import_cells.popleft()
+            if len(xs) > self.BATCH_CELLS:
+                self.import_cells.appendleft((xs[self.BATCH_CELLS:], ys[self.BATCH_CELLS:]))
+                xs, ys = xs[:self.BATCH_CELLS], ys[:self.BATCH_CELLS]
+            self.grid_item.add_cells(xs, ys)
+            self.import_points += len(xs)
+
+        elapsed = time.perf_counter() - self.import_start
+        if self.import_futures or self.import_cells:
+            tasks = self.import_done + len(self.import_futures)
+            self.time_label.setText(f'Time: rasterizing {self.import_total} primitives, '
+                                    f'{self.import_done} of {tasks} tasks rasterized, '
+                                    f'{self.import_points} points drawn, {elapsed:.2f} seconds')
+        elif self.figure_time is not None and self.import_total == 1:
+            self.import_timer.stop()
+            algorithm_time, runs = self.figure_time
+            self.time_label.setText(f'Time: algorithm {algorithm_time * 1e6:.2f} microseconds '
+                                    f'({self.runs_text(runs)}, {self.import_points} points), '
+                                    f'drawn in {elapsed:.2f} seconds')
+        else:
+            self.import_timer.stop()
+            self.time_label.setText(f'Time: {self.import_total} primitives '
+                                    f'({self.import_points} points) {elapsed:.2f} seconds')
+
+    def cancel_import(self):
+        self.import_timer.stop()
+        for future in self.import_futures:
+            future.cancel()
+        self.import_futures = []
+        self.figure_futures.clear()
+        self.import_cells.clear()
+
+    def closeEvent(self, event):
+        self.cancel_import()
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+        super().closeEvent(event)
+
     def convert_x(self, x):
         return x * self.grid_spacing
 
@@ -230,11 +415,6 @@ class MainWindow(QMainWindow):
     def convert_y_center(self, y):
         return y * self.grid_spacing + self.grid_spacing // 2
 
-    def brush_cell(self, x, y):
-        x = self.convert_x_center(x)
-        y = self.convert_y_center(y)
-        self.grid_item.add_cell(x // self.grid_item.spacing * self.grid_item.spacing,
-                               y // self.grid_item.spacing * self.grid_item.spacing)
-
     def set_algorithm_state(self, index):
-        self.state = index
\ No newline at end of file
+        self.state = index
+        self.vertices_edit.setEnabled(index == self.POLYGON_STATE)
\ No newline at end of file
@@ -0,0 +1,331 @@
+import time
+import numpy as np
+from common.profiling import profiled, cells, spans
+
+# алгоритмы растеризации без Qt: возвращают номера закрашиваемых клеток
+# массивами xs, ys в порядке обхода. Скалярные функции - пошаговые циклы,
+# rasterize_lines / rasterize_circles обрабатывают сразу много фигур и
+# дают те же клетки в том же порядке
+
+# отрезки одинаковой длины накапливаются блоками такого размера
+CHUNK_SIZE = 4096
+
+# на замер одного вызова уходит не больше MEASURE_TIME секунд и MAX_RUNS повторов
+MEASURE_TIME = 0.02
+MAX_RUNS = 1000
+
+# исходная версия переводила вещественный x пошагового алгоритма в клетку
+# через центр клетки сетки STEP_SPACING пикселей: (x * 25 + 12) // 25, то
+# есть floor(x + 0.48), а не округление; клетки сохраняются те же
+STEP_SPACING = 25
+
+
+def step_cell(x):
+    return (x * STEP_SPACING + STEP_SPACING // 2) // STEP_SPACING
+
+
+def to_arrays(xs, ys):
+    return np.array(xs, dtype=np.int64), np.array(ys, dtype=np.int64)
+
+
+def step_line(x0, y0, x1, y1):
+    xs, ys = [], []
+    if x1 == x0:
+        step_y = 1 if y1 > y0 else -1
+        y = y0
+        for _ in range(abs(y1 - y0) + 1):
+            xs.append(x0)
+            ys.append(y)
+            y += step_y
+    else:
+        k = (y1 - y0) / (x1 - x0)
+        b = y0 - k * x0
+
+        steps = max(abs(x1 - x0), abs(y1 - y0))
+        step_x = (x1 - x0) / steps
+
+        x = x0
+        for _ in range(steps + 1):
+            xs.append(int(step_cell(x)))
+            ys.append(round(k * x + b))
+            x += step_x
+    return to_arrays(xs, ys)
+
+
+def dda_line(x0, y0, x1, y1):
+    steps = max(abs(x1 - x0), abs(y1 - y0))
+    if steps == 0:
+        return to_arrays([x0], [y0])
+
+    dx, dy = (x1 - x0) / steps, (y1 - y0) / steps
+    x, y = x0, y0
+    xs, ys = [], []
+    for _ in range(steps + 1):
+        xs.append(round(x))
+        ys.append(round(y))
+        x += dx
+        y += dy
+    return to_arrays(xs, ys)
+
+
+def bresenham_line(x0, y0, x1, y1):
+    dx, dy = abs(x1 - x0), abs(y1 - y0)
+    lx = 1 if x0 < x1 else -1
+    ly = 1 if y0 < y1 else -1
+    error = dx - dy
+
+    xs, ys = [], []
+    while True:
+        xs.append(x0)
+        ys.append(y0)
+        if x0 == x1 and y0 == y1:
+            break
+        e2 = error * 2
+        if e2 > -dy:
+            error -= dy
+            x0 += lx
+        if e2 < dx:
+            error += dx
+            y0 += ly
+    return to_arrays(xs, ys)
+
+
+# порядок, в котором точка октанта отражается в остальные семь
+OCTANTS = np.array([(1, 0, 0, 1), (-1, 0, 0, 1), (1, 0, 0, -1), (-1, 0, 0, -1),
+                    (0, 1, 1, 0), (0, -1, 1, 0), (0, 1, -1, 0), (0, -1, -1, 0)])
+
+
+def bresenham_circle(xc, yc, r):
+    xs, ys = [], []
+    x, y = 0, r
+    d = 3 - 2 * r
+    while y >= x:
+        for dx, dy in [(x, y), (-x, y), (x, -y), (-x, -y), (y, x), (-y, x), (y, -x), (-y, -x)]:
+            xs.append(xc + dx)
+            ys.append(yc + dy)
+        x += 1
+        if d > 0:
+            y -= 1
+            d += 4 * (x - y) + 10
+        else:
+            d += 4 * x + 6
+    return to_arrays(xs, ys)
+
+
+def segment_index(counts):
+    # для каждой точки результата - номер фигуры и номер точки в ней
+    figure = np.repeat(np.arange(len(counts)), counts)
+    starts = np.cumsum(counts) - counts
+    return figure, np.arange(figure.size) - starts[figure]
+
+
+def accumulate(starts, increments, counts):
+    # x += dx по шагам, как в скалярном цикле: cumsum вдоль строки складывает
+    # последовательно, поэтому и ошибки округления получаются те же самые.
+    # Отрезки сортируются по длине, чтобы строки блока мало дополнялись
+    offsets = np.cumsum(counts) - counts
+    out = np.empty(int(counts.sum()), dtype=np.float64)
+    order = np.argsort(counts, kind='stable')
+    for chunk in range(0, order.size, CHUNK_SIZE):
+        index = order[chunk:chunk + CHUNK_SIZE]
+        width = int(counts[index].max())
+        values = np.empty((index.size, width), dtype=np.float64)
+        values[:, 0] = starts[index]
+        values[:, 1:] = increments[index, None]
+        np.cumsum(values, axis=1, out=values)
+
+        inside = np.arange(width) < counts[index, None]
+        out[(offsets[index, None] + np.arange(width))[inside]] = values[inside]
+    return out
+
+
+def rasterize_step(x0, y0, x1, y1):
+    steps = np.maximum(np.abs(x1 - x0), np.abs(y1 - y0))
+    vertical = x1 == x0
+    counts = np.where(vertical, np.abs(y1 - y0), steps) + 1
+    figure, i = segment_index(counts)
+
+    # вертикальные отрезки - по y с шагом 1
+    step_y = np.where(y1 > y0, 1, -1)
+    xs = x0[figure].copy()
+    ys = y0[figure] + step_y[figure] * i
+
+    # остальные: x с шагом dx / steps, y = round(k * x + b)
+    sloped = ~vertical
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k = (y1 - y0) / (x1 - x0)
+        step_x = (x1 - x0) / steps
+        b = y0 - k * x0
+    x = accumulate(x0[sloped].astype(np.float64), step_x[sloped], counts[sloped])
+    points = sloped[figure]
+    xs[points] = step_cell(x)
+    ys[points] = np.rint(k[figure[points]] * x + b[figure[points]])
+    return xs, ys
+
+
+def rasterize_dda(x0, y0, x1, y1):
+    steps = np.maximum(np.abs(x1 - x0), np.abs(y1 - y0))
+    counts = steps + 1
+    # у вырожденного отрезка шаг не нужен: точка одна
+    safe = np.maximum(steps, 1)
+    xs = accumulate(x0.astype(np.float64), (x1 - x0) / safe, counts)
+    ys = accumulate(y0.astype(np.float64), (y1 - y0) / safe, counts)
+    return np.rint(xs).astype(np.int64), np.rint(ys).astype(np.int64)
+
+
+def rasterize_bresenham(x0, y0, x1, y1):
+    # замкнутая форма цикла Брезенхема: после i шагов по главной оси
+    # по второй сделано ceil((2 i d_minor - d_major) / (2 d_major)) шагов
+    dx, dy = np.abs(x1 - x0), np.abs(y1 - y0)
+    lx = np.where(x0 < x1, 1, -1)
+    ly = np.where(y0 < y1, 1, -1)
+    major = np.maximum(dx, dy)
+    minor = np.minimum(dx, dy)
+    figure, i = segment_index(major + 1)
+
+    # у вырожденного отрезка числитель -1, а точка одна - без сдвига
+    shift = np.maximum(2 * i * minor[figure] + major[figure] - 1, 0) // np.maximum(2 * major[figure], 1)
+    x_major = (dx >= dy)[figure]
+    xs = x0[figure] + lx[figure] * np.where(x_major, i, shift)
+    ys = y0[figure] + ly[figure] * np.where(x_major, shift, i)
+    return xs, ys
+
+
+LINE_ALGORITHMS = {
+    'step': (step_line, rasterize_step),
+    'dda': (dda_line, rasterize_dda),
+    'bresenham': (bresenham_line, rasterize_bresenham),
+}
+
+
+@profiled('rasterize_lines', size=cells)
+def rasterize_lines(segments, algorithm='bresenham'):
+    # segments - массив (N, 4) из x0, y0, x1, y1; клетки всех отрезков подряд
+    segments = np.asarray(segments, dtype=np.int64).reshape(-1, 4)
+    _, rasterize = LINE_ALGORITHMS[algorithm]
+    return rasterize(*segments.T)
+
+
+def isqrt(n):
+    # целый корень: после округления float64 поправка не больше чем на единицу
+    root = np.floor(np.sqrt(n.astype(np.float64))).astype(np.int64)
+    root -= root * root > n
+    root += (root + 1) * (root + 1) <= n
+    return root
+
+
+@profiled('rasterize_circles', size=cells)
+def rasterize_circles(circles):
+    # circles - массив (N, 3) из xc, yc, r. Октант считается без цикла: при
+    # d <= 0 y сохраняется, пока 2y^2 - 6y не больше порога для текущего x,
+    # иначе уменьшается на единицу; y + x при этом не убывает, поэтому
+    # ограничение "не больше чем на единицу за шаг" - накопленный максимум
+    circles = np.asarray(circles, dtype=np.int64).reshape(-1, 3)
+    xc, yc, r = circles.T
+    figure, x = segment_index(r + 1)
+    radius = r[figure]
+
+    previous = x - 1
+    limit = 2 * (2 * radius * radius - 4 * radius - 3 - 2 * previous * previous - 8 * previous) + 9
+    y = np.where(limit < 0, -2 * radius - 2, (isqrt(np.maximum(limit, 0)) + 3) // 2)
+    y[x == 0] = radius[x == 0]
+
+    # смещение по номеру окружности не даёт максимуму перетечь в следующую
+    offset = figure * (4 * (int(r.max(initial=0)) + 2))
+    y = np.maximum.accumulate(y + x + offset) - x - offset
+
+    inside = y >= x
+    figure, x, y = figure[inside], x[inside], y[inside]
+    xs = xc[figure, None] + OCTANTS[:, 0] * x[:, None] + OCTANTS[:, 1] * y[:, None]
+    ys = yc[figure, None] + OCTANTS[:, 2] * x[:, None] + OCTANTS[:, 3] * y[:, None]
+    return xs.ravel(), ys.ravel()
+
+
+@profiled('scanline_polygon', size=spans)
+def scanline_polygon(vertices):
+    # заливка многоугольника по строкам: рёбра сортируются по нижнему y,
+    # список активных рёбер меняется только в вершинах. Между соседними
+    # вершинами набор активных рёбер постоянен, и пересечения всех строк
+    # интервала со всеми его рёбрами считаются одним массивом. Клетка
+    # закрашена, если её центр внутри (правило чётности); левая и верхняя
+    # границы включаются, правая и нижняя нет, так что соседние
+    # многоугольники не перекрываются. Результат - отрезки строк
+    # rows, starts, ends с концами включительно
+    points = np.asarray(vertices, dtype=np.int64).reshape(-1, 2)
+    x0, y0 = points.T
+    x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+
+    # таблица рёбер без горизонтальных: нижний y, верхний y, x в нижней
+    # точке, приращения по x и y
+    sloped = y0 != y1
+    upward = y0 < y1
+    bottom = np.where(upward, y0, y1)[sloped]
+    top = np.where(upward, y1, y0)[sloped]
+    start_x = np.where(upward, x0, x1)[sloped]
+    dx = np.where(upward, x1 - x0, x0 - x1)[sloped]
+    dy = (top - bottom)
+    order = np.argsort(bottom, kind='stable')
+    bottom, top, start_x, dx, dy = bottom[order], top[order], start_x[order], dx[order], dy[order]
+
+    rows, starts, ends = [], [], []
+    events = np.unique(np.r_[bottom, top])
+    active = np.zeros(0, dtype=np.int64)
+    added = 0
+    for row0, row1 in zip(events[:-1].tolist(), events[1:].tolist()):
+        # рёбра, начавшиеся на row0, входят в список, закончившиеся - выходят
+        entering = np.searchsorted(bottom, row0, side='right')
+        active = np.r_[active, np.arange(added, entering)]
+        added = entering
+        active = active[top[active] > row0]
+        if active.size == 0:
+            continue
+
+        # x пересечения = числитель / dy, потолок - точно в целых числах
+        y = np.arange(row0, row1)[:, None]
+        numerator = start_x[active] * dy[active] + (y - bottom[active]) * dx[active]
+        ceiling = -(-numerator // dy[active])
+        crossing = np.argsort(numerator / dy[active], axis=1, kind='stable')
+        ceiling = np.take_along_axis(ceiling, crossing, axis=1)
+
+        left, right = ceiling[:, 0::2], ceiling[:, 1::2] - 1
+        inside = right >= left
+        rows.append(np.broadcast_to(y, left.shape)[inside])
+        starts.append(left[inside])
+        ends.append(right[inside])
+
+    if not rows:
+        return (np.zeros(0, dtype=np.int64),) * 3
+    return np.concatenate(rows), np.concatenate(starts), np.concatenate(ends)
+
+
+@profiled('scanline_circle', size=spans)
+def scanline_circle(xc, yc, r):
+    # круг, залитый по строкам: каждая строка - от самой левой до самой
+    # правой клетки окружности Брезенхема в ней, так что граница заливки
+    # совпадает с контуром
+    xs, ys = rasterize_circles([(xc, yc, r)])
+    rows = np.arange(yc - r, yc + r + 1)
+    starts = np.full(rows.size, xc + r, dtype=np.int64)
+    ends = np.full(rows.size, xc - r, dtype=np.int64)
+    np.minimum.at(starts, ys - rows[0], xs)
+    np.maximum.at(ends, ys - rows[0], xs)
+    return rows, starts, ends
+
+
+def measure(function, *args, budget=MEASURE_TIME):
+    # первый запуск - прогрев, его результат и возвращается; дальше повторы,
+    # пока следующий ещё укладывается вместе с прогревом в budget секунд.
+    # Время одного вызова - медиана повторов, а если не уложился ни один -
+    # время самого прогрева, и число повторов тогда 0
+    start = time.perf_counter()
+    result = function(*args)
+    last = time.perf_counter() - start
+    times = []
+    while time.perf_counter() + last < start + budget and len(times) < MAX_RUNS:
+        begin = time.perf_counter()
+        function(*args)
+        last = time.perf_counter() - begin
+        times.append(last)
+    if not times:
+        return result, last, 0
+    return result, float(np.median(times)), len(times)
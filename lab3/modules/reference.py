@@ -0,0 +1,65 @@
+import numpy as np
+from PyQt5.QtWidgets import QGraphicsItem
+from PyQt5.QtCore import Qt, QRectF, QPointF, QLineF
+from PyQt5.QtGui import QPainter, QPen
+
+class ReferenceItem(QGraphicsItem):
+    # идеальные отрезки и окружности загруженного списка одним элементом
+    # сцены: координаты хранятся массивами, при отрисовке в QPainter
+    # передаются только фигуры, задевающие видимую область
+    def __init__(self, segments, circles):
+        super(ReferenceItem, self).__init__()
+
+        # segments - (N, 4) из x0, y0, x1, y1, circles - (M, 3) из xc, yc, r,
+        # всё в координатах сцены
+        self.segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+        self.circles = np.asarray(circles, dtype=np.float64).reshape(-1, 3)
+
+        # прямоугольники фигур для отсечения: left, top, right, bottom
+        self.segment_boxes = np.stack([np.minimum(self.segments[:, 0], self.segments[:, 2]),
+                                       np.minimum(self.segments[:, 1], self.segments[:, 3]),
+                                       np.maximum(self.segments[:, 0], self.segments[:, 2]),
+                                       np.maximum(self.segments[:, 1], self.segments[:, 3])], axis=1)
+        self.circle_boxes = np.stack([self.circles[:, 0] - self.circles[:, 2],
+                                      self.circles[:, 1] - self.circles[:, 2],
+                                      self.circles[:, 0] + self.circles[:, 2],
+                                      self.circles[:, 1] + self.circles[:, 2]], axis=1)
+
+        boxes = np.concatenate([self.segment_boxes, self.circle_boxes])
+        if len(boxes):
+            left, top = boxes[:, :2].min(axis=0)
+            right, bottom = boxes[:, 2:].max(axis=0)
+            # запас на толщину линии
+            self.bounds = QRectF(left - 1, top - 1, right - left + 2, bottom - top + 2)
+        else:
+            self.bounds = QRectF()
+
+        self.pen = QPen(Qt.blue)
+        # толщина в пикселях экрана: при отдалении линии не пропадают
+        self.pen.setCosmetic(True)
+
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption)
+
+    def boundingRect(self):
+        return self.bounds
+
+    def visible(self, boxes, rect):
+        return ((boxes[:, 0] <= rect.right()) & (boxes[:, 2] >= rect.left())
+                & (boxes[:, 1] <= rect.bottom()) & (boxes[:, 3] >= rect.top()))
+
+    def paint(self, painter, option, widget):
+        device = painter.worldTransform().inverted()[0].mapRect(QRectF(painter.viewport()))
+        exposed = option.exposedRect.intersected(device)
+
+        painter.save()
+        # без сглаживания тысячи длинных линий рисуются в разы быстрее
+        painter.setRenderHint(QPainter.Antialiasing, False)
+        painter.setPen(self.pen)
+        painter.setBrush(Qt.NoBrush)
+
+        segments = self.segments[self.visible(self.segment_boxes, exposed)]
+        if len(segments):
+            painter.drawLines([QLineF(*segment) for segment in segments.tolist()])
+        for xc, yc, r in self.circles[self.visible(self.circle_boxes, exposed)].tolist():
+            painter.drawEllipse(QPointF(xc, yc), r, r)
+        painter.restore()
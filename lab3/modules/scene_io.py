@@ -0,0 +1,111 @@
+import os
+import csv
+import json
+import numpy as np
+from modules.raster import (LINE_ALGORITHMS, bresenham_circle, rasterize_circles, rasterize_lines,
+                           scanline_circle, scanline_polygon, measure, MEASURE_TIME)
+
+# списки фигур из файлов: CSV с заголовком или JSON-массив объектов с
+# полями type, algorithm, x0, y0, x1, y1 (отрезок) или type, x0, y0, r
+# (окружность, центр и радиус). Алгоритм отрезка - step, dda или bresenham,
+# у окружности он один и может быть не указан:
+#
+#   type,algorithm,x0,y0,x1,y1,r
+#   segment,dda,0,0,10,4,
+#   circle,bresenham,5,5,,,3
+
+CIRCLE_ALGORITHMS = ('bresenham',)
+
+# столько фигур растеризует одна задача пула
+TASK_FIGURES = 2000
+
+
+def read_records(path):
+    if os.path.splitext(path)[1].lower() == '.json':
+        with open(path) as file:
+            records = json.load(file)
+        if isinstance(records, dict):
+            records = records.get('primitives', [])
+        if not isinstance(records, list):
+            raise ValueError(f'{path}: expected a list of primitives')
+        return records
+    with open(path, newline='') as file:
+        return list(csv.DictReader(file))
+
+
+def parse_record(record, fields):
+    # пустые ячейки CSV и отсутствующие поля JSON одинаково считаются ошибкой
+    values = []
+    for field in fields:
+        value = record.get(field)
+        if value is None or value == '':
+            raise ValueError(f'missing {field}')
+        if isinstance(value, float) and not value.is_integer():
+            raise ValueError(f'{field} must be an integer, got {value}')
+        values.append(int(value))
+    return values
+
+
+def load_primitives(path):
+    # фигуры, сгруппированные по алгоритму: отрезки - массивы (N, 4),
+    # окружности - массив (M, 3) под ключом 'circle'
+    groups = {name: [] for name in LINE_ALGORITHMS}
+    groups['circle'] = []
+    for number, record in enumerate(read_records(path), 1):
+        try:
+            if not isinstance(record, dict):
+                raise ValueError('expected an object')
+            kind = str(record.get('type') or '').strip().lower()
+            algorithm = str(record.get('algorithm') or '').strip().lower()
+            if kind == 'segment':
+                if algorithm not in LINE_ALGORITHMS:
+                    raise ValueError(f'unknown segment algorithm {algorithm!r}')
+                groups[algorithm].append(parse_record(record, ('x0', 'y0', 'x1', 'y1')))
+            elif kind == 'circle':
+                if algorithm and algorithm not in CIRCLE_ALGORITHMS:
+                    raise ValueError(f'unknown circle algorithm {algorithm!r}')
+                circle = parse_record(record, ('x0', 'y0', 'r'))
+                if circle[2] < 0:
+                    raise ValueError('negative radius')
+                groups['circle'].append(circle)
+            else:
+                raise ValueError(f'unknown primitive type {kind!r}')
+        except (TypeError, ValueError) as error:
+            raise ValueError(f'{path}, primitive {number}: {error}') from None
+
+    return {name: np.array(figures, dtype=np.int64).reshape(-1, 3 if name == 'circle' else 4)
+            for name, figures in groups.items()}
+
+
+def rasterize_group(name, figures):
+    # точка входа задачи пула: функция модуля, чтобы её можно было передать в процесс
+    if name == 'circle':
+        return rasterize_circles(figures)
+    return rasterize_lines(figures, name)
+
+
+def draw_figure(name, figure, budget=MEASURE_TIME):
+    # одна фигура из окна, в самом окне или в пуле. Клетки отрезка или
+    # окружности считает векторная версия, а время - выбранный пошаговый
+    # алгоритм, клетки у них одинаковые. Заливки 'disk' (xc, yc, r) и
+    # 'polygon' (список вершин) - отрезки строк, время - их же расчёт.
+    # Результат - (клетки или отрезки, время одного вызова, число повторов)
+    if name == 'disk':
+        return measure(scanline_circle, *figure, budget=budget)
+    if name == 'polygon':
+        return measure(scanline_polygon, figure, budget=budget)
+    if name == 'circle':
+        cells = rasterize_circles([figure])
+        _, seconds, runs = measure(bresenham_circle, *figure, budget=budget)
+    else:
+        cells = rasterize_lines([figure], name)
+        _, seconds, runs = measure(LINE_ALGORITHMS[name][0], *figure, budget=budget)
+    return cells, seconds, runs
+
+
+def split_tasks(primitives):
+    # (алгоритм, фигуры) для пула: результаты приходят по частям и
+    # рисуются, пока остальные задачи ещё считаются
+    return [(name, figures[start:start + TASK_FIGURES])
+            for name, figures in primitives.items()
+            for start in range(0, len(figures), TASK_FIGURES)]
@@ -0,0 +1,118 @@
+import numpy as np
+from modules.grid import GridItem
+
+
+def occupied(grid):
+    # закрашенные клетки без пустых кусков
+    return {key: chunk for key, chunk in grid.chunks.items() if chunk.any()}
+
+
+def test_add_cells_accumulates_and_clears(app):
+    grid = GridItem(10)
+    grid.add_cells([0, 31, 32, -1], [0, 0, 0, -1])
+    grid.add_cells([0], [1])
+    assert set(grid.chunks) == {(0, 0), (1, 0), (-1, -1)}
+    assert grid.chunks[0, 0].sum() == 3
+    grid.clear_cells()
+    assert not occupied(grid)
+
+
+def test_cells_outside_canvas_dropped(app):
+    grid = GridItem(10)
+    limit = GridItem.CELL_LIMIT
+    grid.add_cells([limit - 1, limit, -limit, -limit - 1], [0, 0, limit - 1, 0])
+    assert sum(chunk.sum() for chunk in grid.chunks.values()) == 2
+
+
+def render(grid, left, top, cells, pixels=None):
+    # область cells x cells клеток начиная с (left, top) в картинку со
+    # стороной pixels, по умолчанию в масштабе 1:1
+    from PyQt5.QtCore import QRectF, Qt
+    from PyQt5.QtGui import QImage, QPainter
+    from PyQt5.QtWidgets import QGraphicsScene
+    scene = QGraphicsScene()
+    scene.addItem(grid)
+    side = cells * grid.spacing
+    pixels = pixels or side
+    image = QImage(pixels, pixels, QImage.Format_RGB32)
+    image.fill(Qt.white)
+    painter = QPainter(image)
+    scene.render(painter, QRectF(0, 0, pixels, pixels),
+                 QRectF(left * grid.spacing, top * grid.spacing, side, side))
+    painter.end()
+    scene.removeItem(grid)
+    return image
+
+
+def test_paint_partly_visible_empty_chunk(app):
+    # видна только пустая часть куска (0, 0), закрашенная клетка - за краем
+    grid = GridItem(10)
+    grid.add_cells([31, 2], [31, 40])
+    image = render(grid, 0, 0, 20)
+    assert image.pixelColor(25, 25).name() == '#ffffff'
+
+
+def test_paint_fills_visible_cells(app):
+    grid = GridItem(10)
+    grid.add_cells([3, 31], [4, 31])
+    image = render(grid, 0, 0, 20)
+    # середина клетки (3, 4) закрашена цветом Qt.gray, соседняя - нет
+    assert image.pixelColor(35, 45).name() == '#a0a0a4'
+    assert image.pixelColor(55, 45).name() == '#ffffff'
+
+
+def span_cells(grid):
+    # клетки всех блоков отрезков
+    return {(x, int(row)) for block in grid.span_blocks for row, start, end in zip(*block[1])
+            for x in range(int(start), int(end) + 1)}
+
+
+def test_add_spans_merges_rows():
+    rng = np.random.default_rng(3)
+    grid = GridItem(10)
+    expected = set()
+    for _ in range(5):
+        rows = rng.integers(-20, 20, 200)
+        starts = rng.integers(-50, 50, 200)
+        ends = starts + rng.integers(-2, 10, 200)
+        grid.add_spans(rows, starts, ends)
+        expected |= {(x, row) for row, start, end in zip(rows.tolist(), starts.tolist(), ends.tolist())
+                     for x in range(start, end + 1)}
+    assert span_cells(grid) == expected
+    for block in grid.span_blocks:
+        rows, starts, ends = block[1]
+        # в строке отрезки упорядочены и не касаются друг друга
+        same = rows[1:] == rows[:-1]
+        assert np.all(rows[1:] >= rows[:-1])
+        assert np.all(starts[1:][same] > ends[:-1][same] + 1)
+    grid.clear_cells()
+    assert not grid.span_blocks
+
+
+def test_spans_clipped_to_canvas():
+    grid = GridItem(10)
+    limit = GridItem.CELL_LIMIT
+    grid.add_spans([0, limit, -limit, 1], [-limit - 5, 0, limit - 2, 5], [-limit + 1, 3, limit + 7, 4])
+    assert span_cells(grid) == {(-limit, 0), (-limit + 1, 0), (limit - 2, -limit), (limit - 1, -limit)}
+
+
+def test_paint_spans(app):
+    grid = GridItem(10)
+    grid.add_spans([2, 3], [-1000000, 5], [1, 1000000])
+    image = render(grid, 0, 0, 20)
+    assert image.pixelColor(15, 25).name() == '#a0a0a4'
+    assert image.pixelColor(25, 25).name() == '#ffffff'
+    assert image.pixelColor(195, 35).name() == '#a0a0a4'
+    assert image.pixelColor(45, 35).name() == '#ffffff'
+
+
+def test_paint_spans_zoomed_out(app):
+    # 2000 клеток на 100 пикселей: отрезки огрубляются до блоков клеток
+    from modules.raster import scanline_circle
+    grid = GridItem(10)
+    grid.add_spans(*scanline_circle(0, 0, 500))
+    image = render(grid, -1000, -1000, 2000, 100)
+    assert image.pixelColor(45, 45).name() == '#a0a0a4'
+    assert image.pixelColor(40, 62).name() == '#a0a0a4'
+    assert image.pixelColor(10, 10).name() == '#ffffff'
+    assert len(grid.span_blocks[0]) == 2
@@ -0,0 +1,89 @@
+from fractions import Fraction
+import numpy as np
+import pytest
+from modules.raster import (LINE_ALGORITHMS, MAX_RUNS, bresenham_circle, measure, rasterize_circles,
+                            rasterize_lines)
+
+# эталон для пакетных растеризаторов - скалярные циклы
+
+RNG = np.random.default_rng(3)
+
+
+def random_segments(count, spread):
+    segments = RNG.integers(-spread, spread + 1, size=(count, 4))
+    # вырожденные, вертикальные, горизонтальные и диагональные отрезки
+    segments[:10, 2:] = segments[:10, :2]
+    segments[10:20, 2] = segments[10:20, 0]
+    segments[20:30, 3] = segments[20:30, 1]
+    segments[30:40, 3] = segments[30:40, 1] + (segments[30:40, 2] - segments[30:40, 0])
+    return segments
+
+
+def concatenate(results):
+    xs, ys = zip(*results)
+    return np.concatenate(xs), np.concatenate(ys)
+
+
+@pytest.mark.parametrize('algorithm', list(LINE_ALGORITHMS))
+@pytest.mark.parametrize('spread', [3, 50, 2000])
+def test_rasterize_lines_matches_scalar(algorithm, spread):
+    scalar, _ = LINE_ALGORITHMS[algorithm]
+    segments = random_segments(300, spread)
+    xs, ys = rasterize_lines(segments, algorithm)
+    expected_xs, expected_ys = concatenate(scalar(*map(int, segment)) for segment in segments)
+    np.testing.assert_array_equal(xs, expected_xs)
+    np.testing.assert_array_equal(ys, expected_ys)
+
+
+def test_rasterize_lines_empty():
+    xs, ys = rasterize_lines(np.zeros((0, 4), dtype=np.int64))
+    assert xs.size == ys.size == 0
+
+
+def test_rasterize_circles_matches_scalar():
+    radii = np.r_[np.arange(0, 60), RNG.integers(60, 3000, 40)]
+    circles = np.c_[RNG.integers(-1000, 1000, (radii.size, 2)), radii]
+    xs, ys = rasterize_circles(circles)
+    expected_xs, expected_ys = concatenate(bresenham_circle(*map(int, circle)) for circle in circles)
+    np.testing.assert_array_equal(xs, expected_xs)
+    np.testing.assert_array_equal(ys, expected_ys)
+
+
+def test_measure_warms_up_within_budget():
+    calls = []
+    result, seconds, runs = measure(lambda: calls.append(1) or len(calls), budget=0.01)
+    # результат - от прогрева, повторы - сверх него
+    assert result == 1
+    assert len(calls) == runs + 1 and 1 <= runs <= MAX_RUNS
+    assert seconds >= 0
+
+
+def test_measure_slow_call_runs_once():
+    import time
+    calls = []
+    _, seconds, runs = measure(lambda: calls.append(time.sleep(0.02)), budget=0.01)
+    assert runs == 0 and len(calls) == 1
+    assert seconds >= 0.02
+
+
+@pytest.mark.parametrize('name', list(LINE_ALGORITHMS) + ['circle'])
+def test_draw_figure_cells_match_scalar(name):
+    from modules.scene_io import draw_figure
+    figure = (3, -4, 20) if name == 'circle' else (3, -4, 40, 11)
+    scalar = bresenham_circle if name == 'circle' else LINE_ALGORITHMS[name][0]
+    (xs, ys), seconds, runs = draw_figure(name, figure)
+    expected_xs, expected_ys = scalar(*figure)
+    np.testing.assert_array_equal(xs, expected_xs)
+    np.testing.assert_array_equal(ys, expected_ys)
+    assert seconds > 0 and runs >= 1
+
+
+def test_step_line_keeps_original_x_rounding():
+    # x идёт с шагом 0.5: исходная версия клала 1.5 в клетку 1, а не 2
+    xs, ys = LINE_ALGORITHMS['step'][0](0, 0, 3, 6)
+    assert xs.tolist() == [0, 0, 1, 1, 2, 2, 3]
+    assert ys.tolist() == [0, 1, 2, 3, 4, 5, 6]
+    batch_xs, batch_ys = rasterize_lines([(0, 0, 3, 6), (0, 0, 1, 49)], 'step')
+    assert batch_xs[:7].tolist() == xs.tolist()
+    # 25 / 49 чуть больше половины, но меньше 0.52
+    assert batch_xs[7 + 25] == 0
@@ -0,0 +1,57 @@
+from fractions import Fraction
+import numpy as np
+import pytest
+from modules.raster import bresenham_circle, scanline_circle, scanline_polygon
+
+# эталон для заливок - перебор клеток
+
+
+def span_cells(spans):
+    rows, starts, ends = spans
+    assert np.all(starts <= ends)
+    return {(x, y) for y, start, end in zip(rows.tolist(), starts.tolist(), ends.tolist())
+            for x in range(start, end + 1)}
+
+
+def brute_force_polygon(vertices):
+    # точка (x, y) внутри, если левее неё нечётное число пересечений рёбер
+    # со строкой y; ребро учитывает строки от нижнего конца включительно до
+    # верхнего исключительно
+    edges = [(a, b) for a, b in zip(vertices, vertices[1:] + vertices[:1]) if a[1] != b[1]]
+    xs, ys = [x for x, _ in vertices], [y for _, y in vertices]
+    cells = set()
+    for y in range(min(ys), max(ys) + 1):
+        crossings = [x0 + Fraction((y - y0) * (x1 - x0), y1 - y0)
+                     for (x0, y0), (x1, y1) in edges if min(y0, y1) <= y < max(y0, y1)]
+        for x in range(min(xs), max(xs) + 1):
+            if sum(crossing <= x for crossing in crossings) % 2:
+                cells.add((x, y))
+    return cells
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_scanline_polygon_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    vertices = [tuple(point) for point in rng.integers(-12, 13, size=(rng.integers(3, 9), 2)).tolist()]
+    assert span_cells(scanline_polygon(vertices)) == brute_force_polygon(vertices)
+
+
+def test_adjacent_polygons_do_not_overlap():
+    left = scanline_polygon([(0, 0), (10, 0), (7, 10), (0, 10)])
+    right = scanline_polygon([(10, 0), (20, 0), (20, 10), (7, 10)])
+    assert not span_cells(left) & span_cells(right)
+    assert span_cells(left) | span_cells(right) == {(x, y) for x in range(20) for y in range(10)}
+
+
+@pytest.mark.parametrize('r', [0, 1, 2, 7, 40, 333])
+def test_scanline_circle_fills_between_outline_extremes(r):
+    xc, yc = 5, -8
+    cells = span_cells(scanline_circle(xc, yc, r))
+    xs, ys = bresenham_circle(xc, yc, r)
+    outline = set(zip(xs.tolist(), ys.tolist()))
+    assert outline <= cells
+    expected = set()
+    for y in set(ys.tolist()):
+        row = [x for x, outline_y in outline if outline_y == y]
+        expected.update((x, y) for x in range(min(row), max(row) + 1))
+    assert cells == expected